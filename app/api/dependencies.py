@@ -0,0 +1,46 @@
+"""
+FastAPI dependencies exposing the application-scoped services
+
+The services are built by a background warm-up task after the server starts;
+these dependencies wait for it, so requests arriving during a cold start are
+held until the services exist rather than failed.
+"""
+
+import asyncio
+from fastapi import Request
+
+from app.services.document_processor import DocumentProcessor
+from app.services.query_processor import QueryProcessor
+from app.services.llm_service import LLMService
+
+
+async def wait_until_ready(request: Request):
+    """Wait for the background warm-up to finish (re-raising its failure, if any)"""
+    warmup = getattr(request.app.state, "warmup_task", None)
+    if warmup is not None:
+        # Shielded so a disconnecting client cannot cancel the warm-up
+        await asyncio.shield(warmup)
+
+
+async def get_vector_store(request: Request):
+    """Get the shared vector store (None if it failed to initialize)"""
+    await wait_until_ready(request)
+    return getattr(request.app.state, "vector_store", None)
+
+
+async def get_document_processor(request: Request) -> DocumentProcessor:
+    """Get the shared document processor"""
+    await wait_until_ready(request)
+    return request.app.state.document_processor
+
+
+async def get_llm_service(request: Request) -> LLMService:
+    """Get the shared LLM service"""
+    await wait_until_ready(request)
+    return request.app.state.llm_service
+
+
+async def get_query_processor(request: Request) -> QueryProcessor:
+    """Get the shared query processor"""
+    await wait_until_ready(request)
+    return request.app.state.query_processor
@@ -3,26 +3,202 @@ API routes for the LLM Document Processing System
 """
 
 import time
-from typing import List
-from fastapi import APIRouter, HTTPException, Request, BackgroundTasks, UploadFile, File, Form
+import asyncio
+from typing import List, Tuple, Union, AsyncIterator, Dict, Any
+from fastapi import APIRouter, HTTPException, Request, BackgroundTasks, UploadFile, File, Form, Depends
+from fastapi.responses import StreamingResponse
 from loguru import logger
 import json
 
 from app.models.schemas import ProcessingRequest  # We're using direct JSON responses now
-from app.services.document_processor import DocumentProcessor
+from app.services.document_processor import DocumentProcessor, UploadedDocument
 from app.services.query_processor import QueryProcessor
 from app.services.llm_service import LLMService
+from app.models.document import DocumentChunk
 from app.core.config import settings
+from app.core.exceptions import DocumentDownloadError
+from app.api.dependencies import (
+    get_vector_store,
+    get_document_processor,
+    get_llm_service,
+    get_query_processor
+)
 
 router = APIRouter()
 
 
+async def _retrieve_contexts(
+    questions: List[str],
+    vector_store,
+    processed_docs: List[DocumentChunk]
+) -> List[Union[List[DocumentChunk], Exception]]:
+    """Retrieve relevant chunks for all questions with a single batched search"""
+    if not vector_store:
+        # Fallback: use all document chunks (simple but works)
+        return [processed_docs[:10] for _ in questions]  # Limit to first 10 chunks
+    
+    try:
+        # Semantic search for relevant chunks, one embedding round trip for all questions
+        return await vector_store.search_many(questions, top_k=10)
+    except Exception as e:
+        return [e for _ in questions]
+
+
+async def _answer_one(
+    question: str,
+    relevant_chunks: Union[List[DocumentChunk], Exception],
+    llm_service: LLMService,
+    semaphore: asyncio.Semaphore
+) -> Tuple[str, List[DocumentChunk]]:
+    """Generate the answer for one question once a concurrency slot is free"""
+    if isinstance(relevant_chunks, Exception):
+        raise relevant_chunks
+    
+    async with semaphore:
+        # Generate answer using LLM
+        answer = await llm_service.generate_answer(
+            question=question,
+            context_chunks=relevant_chunks
+        )
+        return answer, relevant_chunks
+
+
+async def _answer_questions(
+    questions: List[str],
+    vector_store,
+    llm_service: LLMService,
+    processed_docs: List[DocumentChunk]
+) -> List[Union[Tuple[str, List[DocumentChunk]], Exception]]:
+    """
+    Answer questions concurrently, bounded by MAX_CONCURRENT_QUESTIONS
+    
+    Results keep the order of the questions; a failed question yields its
+    exception in place of a result so the others are unaffected.
+    """
+    contexts = await _retrieve_contexts(questions, vector_store, processed_docs)
+    semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_QUESTIONS)
+    
+    results = await asyncio.gather(
+        *[
+            _answer_one(question, context, llm_service, semaphore)
+            for question, context in zip(questions, contexts)
+        ],
+        return_exceptions=True
+    )
+    
+    for question, result in zip(questions, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error processing question '{question}': {str(result)}")
+    
+    return results
+
+
+async def _read_uploads(
+    documents: List[UploadFile],
+    document_processor: DocumentProcessor
+) -> List[UploadedDocument]:
+    """Read uploaded files with the size limit enforced while streaming"""
+    uploads = []
+    try:
+        for file in documents:
+            uploads.append(await document_processor.read_upload(file))
+    except DocumentDownloadError as e:
+        for upload in uploads:
+            upload.cleanup()
+        raise HTTPException(status_code=413, detail=str(e))
+    return uploads
+
+
+def _format_event(event: Dict[str, Any], sse: bool) -> str:
+    """Serialize a stream event as an NDJSON line or a Server-Sent Events frame"""
+    payload = json.dumps(event)
+    if sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+async def _stream_answers(
+    uploads: List[UploadedDocument],
+    questions: List[str],
+    vector_store,
+    document_processor: DocumentProcessor,
+    llm_service: LLMService,
+    start_time: float,
+    sse: bool
+) -> AsyncIterator[str]:
+    """
+    Run the /run pipeline and yield an event as each stage finishes
+    
+    Emits a "documents_ingested" event, then one "answer" event per question
+    in completion order (tagged with the question index), then "done".
+    """
+    pending = []
+    
+    try:
+        processed_docs = await document_processor.process_documents(uploads)
+        
+        if not processed_docs:
+            yield _format_event({"event": "error", "detail": "No documents could be processed"}, sse)
+            return
+        
+        yield _format_event({
+            "event": "documents_ingested",
+            "document_count": len(processed_docs),
+            "processing_time": time.time() - start_time
+        }, sse)
+        
+        contexts = await _retrieve_contexts(questions, vector_store, processed_docs)
+        semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_QUESTIONS)
+        
+        async def answer_indexed(index: int, question: str, context) -> Tuple[int, str]:
+            try:
+                answer, _ = await _answer_one(question, context, llm_service, semaphore)
+            except Exception as e:
+                logger.error(f"Error processing question '{question}': {str(e)}")
+                answer = f"Unable to process question: {str(e)}"
+            return index, answer
+        
+        pending = [
+            asyncio.ensure_future(answer_indexed(i, question, context))
+            for i, (question, context) in enumerate(zip(questions, contexts))
+        ]
+        
+        for next_done in asyncio.as_completed(pending):
+            index, answer = await next_done
+            yield _format_event({
+                "event": "answer",
+                "index": index,
+                "question": questions[index],
+                "answer": answer
+            }, sse)
+        
+        processing_time = time.time() - start_time
+        logger.info(f"Streaming request processed successfully in {processing_time:.2f} seconds")
+        yield _format_event({"event": "done", "processing_time": processing_time}, sse)
+        
+    except Exception as e:
+        logger.error(f"Error processing streaming request: {str(e)}")
+        yield _format_event({"event": "error", "detail": str(e)}, sse)
+    
+    finally:
+        # Client disconnected or the stream failed: stop any unfinished answers
+        for task in pending:
+            task.cancel()
+        
+        # Spill files are normally removed during processing; make sure none are left behind
+        for upload in uploads:
+            upload.cleanup()
+
+
 @router.post("/run")
 async def process_documents(
     documents: List[UploadFile] = File(...),
     questions: str = Form(...),
-    fastapi_request: Request = None,
-    background_tasks: BackgroundTasks = None
+    background_tasks: BackgroundTasks = None,
+    vector_store=Depends(get_vector_store),
+    document_processor: DocumentProcessor = Depends(get_document_processor),
+    query_processor: QueryProcessor = Depends(get_query_processor),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """
     Process documents and answer questions
@@ -42,60 +218,25 @@ async def process_documents(
         
         logger.info(f"Processing request with {len(documents)} documents and {len(questions)} questions")
         
-        # Initialize services
-        document_processor = DocumentProcessor()
-        query_processor = QueryProcessor()
-        llm_service = LLMService()
-        
-        # Get vector store from app state
-        vector_store = fastapi_request.app.state.vector_store
-        
         # Step 1: Process documents
         logger.info("Starting document processing...")
-        file_paths = []
-        processed_docs = []
-        
-        for file in documents:
-            contents = await file.read()
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.filename.split('.')[-1]}") as temp_file:
-                temp_file.write(contents)
-                file_paths.append(temp_file.name)
+        uploads = await _read_uploads(documents, document_processor)
         
-        processed_docs = await document_processor.process_documents(file_paths)
+        processed_docs = await document_processor.process_documents(uploads)
         
         if not processed_docs:
             raise HTTPException(status_code=400, detail="No documents could be processed")
         
-        # Step 2: Store embeddings in vector database (if available)
-        if vector_store:
-            logger.info("Storing document embeddings...")
-            await vector_store.store_documents(processed_docs)
+        # Step 2: Embeddings were stored by the ingestion pipeline as chunks were produced
         
         # Step 3: Process queries
         logger.info("Processing queries...")
-        answers = []
+        results = await _answer_questions(questions, vector_store, llm_service, processed_docs)
         
-        for question in questions:
-            try:
-                if vector_store:
-                    # Semantic search for relevant chunks
-                    relevant_chunks = await vector_store.search(question, top_k=10)
-                else:
-                    # Fallback: use all document chunks (simple but works)
-                    relevant_chunks = processed_docs[:10]  # Limit to first 10 chunks
-                
-                # Generate answer using LLM
-                answer = await llm_service.generate_answer(
-                    question=question,
-                    context_chunks=relevant_chunks
-                )
-                
-                answers.append(answer)
-                
-            except Exception as e:
-                logger.error(f"Error processing question '{question}': {str(e)}")
-                answers.append(f"Unable to process question: {str(e)}")
+        answers = [
+            f"Unable to process question: {str(result)}" if isinstance(result, Exception) else result[0]
+            for result in results
+        ]
         
         processing_time = time.time() - start_time
         
@@ -108,6 +249,8 @@ async def process_documents(
             "document_count": len(processed_docs)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"Error processing request after {processing_time:.2f} seconds: {str(e)}")
@@ -117,7 +260,10 @@ async def process_documents(
 @router.post("/run/detailed")
 async def process_documents_detailed(
     request: ProcessingRequest,
-    fastapi_request: Request
+    vector_store=Depends(get_vector_store),
+    document_processor: DocumentProcessor = Depends(get_document_processor),
+    query_processor: QueryProcessor = Depends(get_query_processor),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """
     Process documents and return detailed response with metadata
@@ -127,14 +273,6 @@ async def process_documents_detailed(
     try:
         logger.info(f"Processing detailed request with {len(request.documents)} documents and {len(request.questions)} questions")
         
-        # Initialize services
-        document_processor = DocumentProcessor()
-        query_processor = QueryProcessor()
-        llm_service = LLMService()
-        
-        # Get vector store from app state
-        vector_store = fastapi_request.app.state.vector_store
-        
         # Process documents
         processed_docs = await document_processor.process_documents(
             [str(url) for url in request.documents]
@@ -143,50 +281,35 @@ async def process_documents_detailed(
         if not processed_docs:
             raise HTTPException(status_code=400, detail="No documents could be processed")
         
-        # Store embeddings (if available)
-        if vector_store:
-            await vector_store.store_documents(processed_docs)
-        
         # Process queries with detailed information
         answers = []
         query_info = []
         
-        for question in request.questions:
-            try:
-                if vector_store:
-                    # Semantic search
-                    relevant_chunks = await vector_store.search(question, top_k=10)
-                else:
-                    # Fallback: use all document chunks
-                    relevant_chunks = processed_docs[:10]
-                
-                # Generate answer
-                answer = await llm_service.generate_answer(
-                    question=question,
-                    context_chunks=relevant_chunks
-                )
-                
-                answers.append(answer)
-                
-                # Collect query metadata
-                query_info.append({
-                    "question": question,
-                    "answer": answer,
-                    "confidence": 0.85,  # Placeholder - implement confidence scoring
-                    "relevant_chunks": [chunk.content[:200] + "..." for chunk in relevant_chunks[:3]],
-                    "source_documents": list(set([chunk.source for chunk in relevant_chunks]))
-                })
-                
-            except Exception as e:
-                logger.error(f"Error processing question '{question}': {str(e)}")
-                answers.append(f"Unable to process question: {str(e)}")
+        results = await _answer_questions(request.questions, vector_store, llm_service, processed_docs)
+        
+        for question, result in zip(request.questions, results):
+            if isinstance(result, Exception):
+                answers.append(f"Unable to process question: {str(result)}")
                 query_info.append({
                     "question": question,
-                    "answer": f"Error: {str(e)}",
+                    "answer": f"Error: {str(result)}",
                     "confidence": 0.0,
                     "relevant_chunks": [],
                     "source_documents": []
                 })
+                continue
+            
+            answer, relevant_chunks = result
+            answers.append(answer)
+            
+            # Collect query metadata
+            query_info.append({
+                "question": question,
+                "answer": answer,
+                "confidence": 0.85,  # Placeholder - implement confidence scoring
+                "relevant_chunks": [chunk.content[:200] + "..." for chunk in relevant_chunks[:3]],
+                "source_documents": list(set([chunk.source for chunk in relevant_chunks]))
+            })
         
         processing_time = time.time() - start_time
         
@@ -215,4 +338,39 @@ async def process_documents_detailed(
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"Error processing detailed request after {processing_time:.2f} seconds: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/run/stream")
+async def process_documents_stream(
+    documents: List[UploadFile] = File(...),
+    questions: str = Form(...),
+    fastapi_request: Request = None,
+    vector_store=Depends(get_vector_store),
+    document_processor: DocumentProcessor = Depends(get_document_processor),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Process documents and stream answers as they become ready
+    
+    Accepts the same form fields as /run. The response is NDJSON by default,
+    or Server-Sent Events when the client sends "Accept: text/event-stream".
+    """
+    start_time = time.time()
+    
+    try:
+        questions = json.loads(questions)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid questions JSON: {str(e)}")
+    
+    logger.info(f"Processing streaming request with {len(documents)} documents and {len(questions)} questions")
+    
+    # Uploads must be read before the response starts streaming
+    uploads = await _read_uploads(documents, document_processor)
+    
+    sse = "text/event-stream" in fastapi_request.headers.get("accept", "")
+    
+    return StreamingResponse(
+        _stream_answers(uploads, questions, vector_store, document_processor, llm_service, start_time, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson"
+    )
@@ -3,9 +3,12 @@ Configuration settings for the LLM Document Processing System
 """
 
 import os
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, model_validator
+from loguru import logger
+
+from app.utils.tokens import CHARS_PER_TOKEN
 
 
 class Settings(BaseSettings):
@@ -26,15 +29,54 @@ class Settings(BaseSettings):
     VECTOR_DB_TYPE: str = Field(default="faiss", env="VECTOR_DB_TYPE")
     VECTOR_DB_PATH: str = Field(default="./data/vector_db", env="VECTOR_DB_PATH")
     EMBEDDING_DIMENSION: int = Field(default=768, env="EMBEDDING_DIMENSION")
+    CHROMA_EXECUTOR_THREADS: int = Field(default=4, env="CHROMA_EXECUTOR_THREADS")  # Threads running ChromaDB calls
+    FAISS_INDEX_TYPE: str = Field(default="hnsw", env="FAISS_INDEX_TYPE")  # flat, ivf or hnsw
+    FAISS_APPROXIMATE_THRESHOLD: int = Field(default=50000, env="FAISS_APPROXIMATE_THRESHOLD")  # Exact (flat) search below this many chunks
+    FAISS_IVF_NLIST: int = Field(default=0, env="FAISS_IVF_NLIST")  # 0 = about 4 * sqrt(chunks)
+    FAISS_IVF_NPROBE: int = Field(default=16, env="FAISS_IVF_NPROBE")
+    FAISS_HNSW_M: int = Field(default=32, env="FAISS_HNSW_M")
+    FAISS_HNSW_EF_CONSTRUCTION: int = Field(default=100, env="FAISS_HNSW_EF_CONSTRUCTION")
+    FAISS_HNSW_EF_SEARCH: int = Field(default=64, env="FAISS_HNSW_EF_SEARCH")
+    FAISS_MAX_SEGMENTS: int = Field(default=10, env="FAISS_MAX_SEGMENTS")  # Merged in the background above this
+    GEMINI_EMBEDDING_BATCH_SIZE: int = Field(default=100, env="GEMINI_EMBEDDING_BATCH_SIZE")  # API limit per request
+    GEMINI_EMBEDDING_CONCURRENCY: int = Field(default=4, env="GEMINI_EMBEDDING_CONCURRENCY")
+    GEMINI_EMBEDDING_REQUESTS_PER_MINUTE: int = Field(default=600, env="GEMINI_EMBEDDING_REQUESTS_PER_MINUTE")
+    GEMINI_EMBEDDING_MAX_RETRIES: int = Field(default=4, env="GEMINI_EMBEDDING_MAX_RETRIES")
+    GEMINI_EMBEDDING_BACKOFF_SECONDS: float = Field(default=0.5, env="GEMINI_EMBEDDING_BACKOFF_SECONDS")
+    GEMINI_CIRCUIT_FAILURE_THRESHOLD: int = Field(default=5, env="GEMINI_CIRCUIT_FAILURE_THRESHOLD")
+    GEMINI_CIRCUIT_RESET_SECONDS: float = Field(default=30.0, env="GEMINI_CIRCUIT_RESET_SECONDS")
+    LOCAL_EMBEDDING_BACKEND: str = Field(default="fp32", env="LOCAL_EMBEDDING_BACKEND")  # fp32 or int8
+    LOCAL_EMBEDDING_THREADS: int = Field(default=0, env="LOCAL_EMBEDDING_THREADS")  # 0 = torch default
+    LOCAL_EMBEDDING_MAX_SEQ_LENGTH: int = Field(default=0, env="LOCAL_EMBEDDING_MAX_SEQ_LENGTH")  # 0 = model default
+    LOCAL_EMBEDDING_MAX_BATCH_SIZE: int = Field(default=128, env="LOCAL_EMBEDDING_MAX_BATCH_SIZE")
+    LOCAL_EMBEDDING_MAX_WAIT_MS: float = Field(default=5.0, env="LOCAL_EMBEDDING_MAX_WAIT_MS")
+    EMBEDDING_CACHE_ENABLED: bool = Field(default=True, env="EMBEDDING_CACHE_ENABLED")
+    EMBEDDING_CACHE_PATH: str = Field(default="./data/embedding_cache", env="EMBEDDING_CACHE_PATH")
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = Field(default=20000, env="EMBEDDING_CACHE_MEMORY_ENTRIES")
+    EMBEDDING_MIGRATION_BATCH_SIZE: int = Field(default=256, env="EMBEDDING_MIGRATION_BATCH_SIZE")  # Chunks re-embedded per step on a model change
     
     # Document Processing Configuration
     MAX_DOCUMENT_SIZE_MB: int = Field(default=50, env="MAX_DOCUMENT_SIZE_MB")
+    UPLOAD_SPILL_THRESHOLD_MB: int = Field(default=10, env="UPLOAD_SPILL_THRESHOLD_MB")
     SUPPORTED_FORMATS: str = Field(default="pdf,docx,doc,txt,html", env="SUPPORTED_FORMATS")
-    CHUNK_SIZE: int = Field(default=1000, env="CHUNK_SIZE")
-    CHUNK_OVERLAP: int = Field(default=200, env="CHUNK_OVERLAP")
+    CHUNK_SIZE_TOKENS: int = Field(default=256, env="CHUNK_SIZE_TOKENS")
+    CHUNK_OVERLAP_TOKENS: int = Field(default=48, env="CHUNK_OVERLAP_TOKENS")
+    CHUNK_SIZE: Optional[int] = Field(default=None, env="CHUNK_SIZE")  # Deprecated: characters, use CHUNK_SIZE_TOKENS
+    CHUNK_OVERLAP: Optional[int] = Field(default=None, env="CHUNK_OVERLAP")  # Deprecated: characters, use CHUNK_OVERLAP_TOKENS
+    PDF_EXTRACTION_WORKERS: int = Field(default=0, env="PDF_EXTRACTION_WORKERS")  # 0 = one per CPU core
+    PDF_PAGES_PER_TASK: int = Field(default=20, env="PDF_PAGES_PER_TASK")
+    PDF_MIN_PAGE_CHARS: int = Field(default=50, env="PDF_MIN_PAGE_CHARS")  # Below this, retry the page with pdfplumber
+    EMBEDDING_BATCH_SIZE: int = Field(default=64, env="EMBEDDING_BATCH_SIZE")
+    INGESTION_QUEUE_SIZE: int = Field(default=4, env="INGESTION_QUEUE_SIZE")
+    INGESTION_STORE_CONCURRENCY: int = Field(default=4, env="INGESTION_STORE_CONCURRENCY")
+    CHUNK_ENRICHERS: str = Field(default="readability", env="CHUNK_ENRICHERS")  # Empty to disable
+    CHUNK_ENRICHMENT_BATCH_SIZE: int = Field(default=256, env="CHUNK_ENRICHMENT_BATCH_SIZE")
+    TEXT_CACHE_PATH: str = Field(default="./data/text_cache", env="TEXT_CACHE_PATH")
+    TEXT_CACHE_MAX_MB: int = Field(default=512, env="TEXT_CACHE_MAX_MB")  # 0 = disabled
     
     # Performance Configuration
     MAX_CONCURRENT_DOWNLOADS: int = Field(default=5, env="MAX_CONCURRENT_DOWNLOADS")
+    MAX_CONCURRENT_QUESTIONS: int = Field(default=5, env="MAX_CONCURRENT_QUESTIONS")
     RESPONSE_TIMEOUT_SECONDS: int = Field(default=30, env="RESPONSE_TIMEOUT_SECONDS")
     CACHE_TTL_SECONDS: int = Field(default=3600, env="CACHE_TTL_SECONDS")
     
@@ -42,14 +84,35 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
     LOG_FILE: str = Field(default="./logs/app.log", env="LOG_FILE")
     
+    @model_validator(mode="after")
+    def _convert_character_chunk_settings(self) -> "Settings":
+        """Map the deprecated character-based chunk settings onto their token counterparts"""
+        for old, new in (("CHUNK_SIZE", "CHUNK_SIZE_TOKENS"), ("CHUNK_OVERLAP", "CHUNK_OVERLAP_TOKENS")):
+            characters = getattr(self, old)
+            if characters is None:
+                continue
+            if new in self.model_fields_set:
+                logger.warning(f"{old} is deprecated and ignored because {new} is set")
+                continue
+            tokens = max(0, round(characters / CHARS_PER_TOKEN))
+            setattr(self, new, tokens)
+            logger.warning(f"{old} is deprecated; using {new}={tokens} ({characters} characters)")
+        return self
+    
     @property
     def supported_formats_list(self) -> List[str]:
         """Get supported formats as a list"""
         return [fmt.strip().lower() for fmt in self.SUPPORTED_FORMATS.split(",")]
     
+    @property
+    def chunk_enrichers_list(self) -> List[str]:
+        """Get enabled chunk enrichers as a list"""
+        return [name.strip().lower() for name in self.CHUNK_ENRICHERS.split(",") if name.strip()]
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
+        extra = "ignore"  # Settings removed in later versions must not break existing .env files
 
 
 # Global settings instance
@@ -28,6 +28,11 @@ class DocumentDownloadError(Exception):
     pass
 
 
+class CircuitOpenError(Exception):
+    """Raised when a circuit breaker is rejecting calls to a failing dependency"""
+    pass
+
+
 def setup_exception_handlers(app: FastAPI):
     """Setup global exception handlers"""
     
@@ -14,7 +14,7 @@ class DocumentChunk(BaseModel):
     content: str
     source: str
     metadata: Dict[str, Any] = {}
-    embedding: Optional[List[float]] = None
+    embedding: Optional[np.ndarray] = None  # float32, often a view into a batch matrix
     chunk_index: Optional[int] = None
     start_char: Optional[int] = None
     end_char: Optional[int] = None
@@ -22,15 +22,13 @@ class DocumentChunk(BaseModel):
     class Config:
         arbitrary_types_allowed = True
     
-    def set_embedding(self, embedding: np.ndarray):
-        """Set the embedding vector for this chunk"""
-        self.embedding = embedding.tolist() if isinstance(embedding, np.ndarray) else embedding
+    def set_embedding(self, embedding):
+        """Set the embedding vector for this chunk (float32 arrays are kept without copying)"""
+        self.embedding = np.asarray(embedding, dtype=np.float32)
     
     def get_embedding(self) -> Optional[np.ndarray]:
-        """Get the embedding vector as numpy array"""
-        if self.embedding is None:
-            return None
-        return np.array(self.embedding)
+        """Get the embedding vector as a float32 numpy array"""
+        return self.embedding
 
 
 class ProcessedDocument(BaseModel):
@@ -0,0 +1,117 @@
+"""
+Background chunk enrichment: computes optional per-chunk metrics after ingestion
+"""
+
+import asyncio
+from typing import List, Dict, Any, Optional
+from loguru import logger
+
+from app.core.config import settings
+from app.models.document import DocumentChunk
+
+
+class ChunkEnricher:
+    """Base class for a metric computed over batches of chunk texts"""
+
+    name = "base"
+
+    def enrich(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Return one metadata dict per text (runs in a worker thread)"""
+        raise NotImplementedError
+
+
+class ReadabilityEnricher(ChunkEnricher):
+    """Flesch reading-ease score for each chunk"""
+
+    name = "readability"
+
+    def enrich(self, texts: List[str]) -> List[Dict[str, Any]]:
+        import textstat  # Slow to import; loaded on the worker thread at first use
+
+        return [{"readability_score": textstat.flesch_reading_ease(text)} for text in texts]
+
+
+# Enrichers selectable through the CHUNK_ENRICHERS setting
+ENRICHERS = {
+    ReadabilityEnricher.name: ReadabilityEnricher,
+}
+
+
+class ChunkEnrichmentService:
+    """
+    Post-ingestion stage that enriches chunk metadata off the request path
+
+    Ingestion submits stored chunks; a background worker groups them into
+    batches, runs each enricher in a thread, and writes the results back to
+    the vector store's chunk metadata.
+    """
+
+    def __init__(self, vector_store, enrichers: Optional[List[ChunkEnricher]] = None):
+        self.vector_store = vector_store
+        self.enrichers = enrichers if enrichers is not None else self._configured_enrichers()
+        self.batch_size = settings.CHUNK_ENRICHMENT_BATCH_SIZE
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any enrichers are configured"""
+        return bool(self.enrichers)
+
+    def start(self):
+        """Start the background worker"""
+        if self.enabled and self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+            logger.info(f"Chunk enrichment started with: {', '.join(e.name for e in self.enrichers)}")
+
+    def submit(self, chunks: List[DocumentChunk]):
+        """Queue chunks for enrichment; returns immediately"""
+        if self._worker is None:
+            return
+        for chunk in chunks:
+            self.queue.put_nowait(chunk)
+
+    async def close(self):
+        """Stop the background worker, dropping any chunks not yet enriched"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _run(self):
+        """Collect queued chunks into batches and enrich them"""
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                await self._enrich_batch(batch)
+            except Exception as e:
+                logger.error(f"Chunk enrichment failed for {len(batch)} chunks: {str(e)}")
+
+    async def _enrich_batch(self, chunks: List[DocumentChunk]):
+        """Run every enricher over a batch and write the metrics back"""
+        texts = [chunk.content for chunk in chunks]
+        updates: Dict[str, Dict[str, Any]] = {chunk.id: {} for chunk in chunks}
+
+        for enricher in self.enrichers:
+            results = await asyncio.to_thread(enricher.enrich, texts)
+            for chunk, result in zip(chunks, results):
+                updates[chunk.id].update(result)
+
+        await self.vector_store.update_chunk_metadata(updates)
+        logger.debug(f"Enriched {len(chunks)} chunks")
+
+    def _configured_enrichers(self) -> List[ChunkEnricher]:
+        """Build the enrichers named in CHUNK_ENRICHERS"""
+        enrichers = []
+        for name in settings.chunk_enrichers_list:
+            if name in ENRICHERS:
+                enrichers.append(ENRICHERS[name]())
+            else:
+                logger.warning(f"Unknown chunk enricher '{name}', skipping")
+        return enrichers
@@ -0,0 +1,317 @@
+"""
+Columnar, memory-mapped chunk storage for FAISS index segments
+
+A segment's chunks are written as a handful of files instead of a pickled
+list of DocumentChunk models:
+
+    {name}.blob         chunk ids, texts and per-chunk metadata (JSON), back to back
+    {name}.rows.npy     one fixed-size row per chunk: blob offsets, doc ID, positions
+    {name}.lookup.npy   (id hash, row) pairs sorted by hash, for finding a chunk by id
+    {name}.docs.json    interned per-document source and metadata, indexed by doc ID
+    {name}.updates.json metadata merged into chunks after the segment was written
+
+The blob and the row and lookup arrays are memory-mapped, so the resident
+cost of a stored chunk is close to nothing until it is read. Metadata shared
+by every chunk of a document (filename, url, content type, ...) is stored
+once per document. DocumentChunk models are only built for chunks that are
+actually returned, e.g. the top-k hits of a search.
+"""
+
+import os
+import json
+import mmap
+import uuid
+import hashlib
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from pathlib import Path
+import numpy as np
+from loguru import logger
+
+from app.models.document import DocumentChunk
+
+ROW_DTYPE = np.dtype([
+    ('id_offset', '<u8'), ('id_length', '<u4'),
+    ('text_offset', '<u8'), ('text_length', '<u4'),
+    ('meta_offset', '<u8'), ('meta_length', '<u4'),
+    ('doc', '<u4'),
+    ('chunk_index', '<i8'), ('start_char', '<i8'), ('end_char', '<i8'),
+])
+LOOKUP_DTYPE = np.dtype([('hash', '<u8'), ('row', '<u4')])
+MISSING = -1  # Stored for an unset chunk_index, start_char or end_char
+
+# Metadata DocumentProcessor sets once per document (_upload_metadata, _download_document);
+# everything else, e.g. page spans or enricher output, is stored per chunk
+DOCUMENT_METADATA_KEYS = frozenset({
+    'filename', 'format', 'size_bytes', 'content_type', 'url', 'content_hash'
+})
+# Set on search results for the query at hand; never stored
+TRANSIENT_METADATA_KEYS = frozenset({'similarity_score'})
+
+FILE_SUFFIXES = (".blob", ".rows.npy", ".lookup.npy", ".docs.json", ".updates.json")
+
+
+class ChunkRecord(NamedTuple):
+    """A chunk as stored: its document's interned fields kept apart from its own"""
+    id: str
+    content: str
+    source: str
+    chunk_index: Optional[int]
+    start_char: Optional[int]
+    end_char: Optional[int]
+    document_metadata: Dict[str, Any]
+    chunk_metadata: Dict[str, Any]
+
+
+def id_hash(chunk_id: str) -> int:
+    """Stable 64-bit hash of a chunk id"""
+    return int.from_bytes(hashlib.blake2b(chunk_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def records_of(chunks: Iterable[DocumentChunk]) -> Iterator[ChunkRecord]:
+    """Split chunk models into records; embeddings are not kept (they live in the index)"""
+    for chunk in chunks:
+        document_metadata, chunk_metadata = {}, {}
+        for key, value in chunk.metadata.items():
+            if key not in TRANSIENT_METADATA_KEYS:
+                (document_metadata if key in DOCUMENT_METADATA_KEYS else chunk_metadata)[key] = value
+        yield ChunkRecord(
+            chunk.id, chunk.content, chunk.source,
+            chunk.chunk_index, chunk.start_char, chunk.end_char,
+            document_metadata, chunk_metadata
+        )
+
+
+def chunk_of(record: ChunkRecord) -> DocumentChunk:
+    """Build the DocumentChunk model for a record"""
+    return DocumentChunk(
+        id=record.id,
+        content=record.content,
+        source=record.source,
+        metadata={**record.document_metadata, **record.chunk_metadata},
+        chunk_index=record.chunk_index,
+        start_char=record.start_char,
+        end_char=record.end_char
+    )
+
+
+def write_chunk_segment(prefix: Path, records: Iterable[ChunkRecord]) -> int:
+    """
+    Write records as a chunk segment at prefix, returning the number written
+
+    Records are streamed to the blob, so a merge of large segments never
+    holds more than the fixed-size row columns in memory.
+    """
+    rows: List[Tuple] = []
+    hashes: List[int] = []
+    documents: List[Dict[str, Any]] = []
+    document_ids: Dict[Tuple[str, str], int] = {}
+    offset = 0
+
+    with open(f"{prefix}.blob", 'wb') as blob:
+        def put(data: bytes) -> Tuple[int, int]:
+            nonlocal offset
+            blob.write(data)
+            offset += len(data)
+            return offset - len(data), len(data)
+
+        for record in records:
+            # Chunks of one document share a single interned entry
+            key = (record.source, json.dumps(record.document_metadata, sort_keys=True, default=str))
+            doc = document_ids.get(key)
+            if doc is None:
+                doc = document_ids[key] = len(documents)
+                documents.append({"source": record.source, "metadata": json.loads(key[1])})
+
+            chunk_metadata = json.dumps(record.chunk_metadata, default=str) if record.chunk_metadata else ""
+            hashes.append(id_hash(record.id))
+            rows.append((
+                *put(record.id.encode('utf-8')),
+                *put(record.content.encode('utf-8')),
+                *put(chunk_metadata.encode('utf-8')),
+                doc,
+                _stored(record.chunk_index), _stored(record.start_char), _stored(record.end_char),
+            ))
+
+    np.save(f"{prefix}.rows.npy", np.array(rows, dtype=ROW_DTYPE))
+
+    lookup = np.empty(len(rows), dtype=LOOKUP_DTYPE)
+    lookup['hash'] = np.array(hashes, dtype=np.uint64)
+    lookup['row'] = np.arange(len(rows))
+    lookup.sort(order='hash')
+    np.save(f"{prefix}.lookup.npy", lookup)
+
+    with open(f"{prefix}.docs.json", 'w', encoding='utf-8') as f:
+        json.dump(documents, f)
+
+    return len(rows)
+
+
+def remove_chunk_segment(prefix: Path):
+    """Delete a chunk segment's files"""
+    for suffix in FILE_SUFFIXES:
+        path = Path(f"{prefix}{suffix}")
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            # Still mapped elsewhere (e.g. on Windows); removed on the next load
+            logger.debug(f"Could not remove {path}: {str(e)}")
+
+
+class ChunkSegment:
+    """Read side of a chunk segment, plus its in-memory metadata updates"""
+
+    def __init__(self, prefix: Path):
+        self.prefix = Path(prefix)
+        self.blob = _read_blob(Path(f"{prefix}.blob"))
+        self.rows = np.load(f"{prefix}.rows.npy", mmap_mode='r')
+        self.lookup = np.load(f"{prefix}.lookup.npy", mmap_mode='r')
+        with open(f"{prefix}.docs.json", 'r', encoding='utf-8') as f:
+            self.documents: List[Dict[str, Any]] = json.load(f)
+
+        # row -> metadata merged in after writing; persisted through take_updates() and write_updates()
+        self.updates: Dict[int, Dict[str, Any]] = {}
+        self.dirty = False
+        updates_file = Path(f"{prefix}.updates.json")
+        if updates_file.exists():
+            with open(updates_file, 'r', encoding='utf-8') as f:
+                self.updates = {int(row): metadata for row, metadata in json.load(f).items()}
+
+    @property
+    def count(self) -> int:
+        return len(self.rows)
+
+    def find(self, chunk_id: str) -> Optional[int]:
+        """Row of the chunk with this id, or None"""
+        target = id_hash(chunk_id)
+        hashes = self.lookup['hash']
+        i = int(np.searchsorted(hashes, np.uint64(target)))
+        while i < len(hashes) and int(hashes[i]) == target:
+            row = int(self.lookup['row'][i])
+            if self._id(row) == chunk_id:
+                return row
+            i += 1
+        return None
+
+    def chunk(self, row: int) -> DocumentChunk:
+        """Build the DocumentChunk stored at row"""
+        return chunk_of(self.record(row))
+
+    def record(self, row: int, updates: Optional[Dict[int, Dict[str, Any]]] = None) -> ChunkRecord:
+        """The record stored at row, with metadata updates applied"""
+        updates = self.updates if updates is None else updates
+        entry = self.rows[row]
+        document = self.documents[int(entry['doc'])]
+        meta_length = int(entry['meta_length'])
+        chunk_metadata = json.loads(_text(self.blob, entry['meta_offset'], meta_length)) if meta_length else {}
+        if row in updates:
+            chunk_metadata.update(updates[row])
+
+        return ChunkRecord(
+            self._id(row),
+            _text(self.blob, entry['text_offset'], entry['text_length']),
+            document['source'],
+            _optional(entry['chunk_index']), _optional(entry['start_char']), _optional(entry['end_char']),
+            dict(document['metadata']),
+            chunk_metadata
+        )
+
+    def records(self, updates: Optional[Dict[int, Dict[str, Any]]] = None) -> Iterator[ChunkRecord]:
+        """Every record in row order"""
+        for row in range(self.count):
+            yield self.record(row, updates)
+
+    def update(self, row: int, metadata: Dict[str, Any]):
+        """Merge metadata into a stored chunk; persisted through take_updates() and write_updates()"""
+        self.updates.setdefault(row, {}).update(metadata)
+        self.dirty = True
+
+    def take_updates(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot the metadata updates for write_updates() and mark them saved"""
+        self.dirty = False
+        return {str(row): dict(metadata) for row, metadata in self.updates.items()}
+
+    def write_updates(self, snapshot: Dict[str, Dict[str, Any]]):
+        """Write an updates snapshot, replacing the previous file atomically (safe in a worker thread)"""
+        path = Path(f"{self.prefix}.updates.json")
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, default=str)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Unmap the segment's files"""
+        if isinstance(self.blob, mmap.mmap):
+            self.blob.close()
+        self.blob = b""
+        self.rows = np.empty(0, dtype=ROW_DTYPE)
+        self.lookup = np.empty(0, dtype=LOOKUP_DTYPE)
+
+    def _id(self, row: int) -> str:
+        entry = self.rows[row]
+        return _text(self.blob, entry['id_offset'], entry['id_length'])
+
+
+class BufferedChunks:
+    """
+    Chunks of a segment that is still being written, with ChunkSegment's interface
+
+    The records are copied when the segment is frozen, so a worker thread can
+    write them while the event loop keeps reading the segment and merging
+    metadata updates into it.
+    """
+
+    def __init__(self, chunks: List[DocumentChunk], positions: Dict[str, int]):
+        self.base_records: List[ChunkRecord] = list(records_of(chunks))
+        self.positions = positions
+        self.updates: Dict[int, Dict[str, Any]] = {}
+        self.dirty = False  # Updates are handed to the written segment, not saved from here
+
+    @property
+    def count(self) -> int:
+        return len(self.base_records)
+
+    def find(self, chunk_id: str) -> Optional[int]:
+        return self.positions.get(chunk_id)
+
+    def chunk(self, row: int) -> DocumentChunk:
+        return chunk_of(self.record(row))
+
+    def record(self, row: int, updates: Optional[Dict[int, Dict[str, Any]]] = None) -> ChunkRecord:
+        updates = self.updates if updates is None else updates
+        record = self.base_records[row]
+        return record._replace(
+            document_metadata=dict(record.document_metadata),
+            chunk_metadata={**record.chunk_metadata, **updates.get(row, {})}
+        )
+
+    def records(self, updates: Optional[Dict[int, Dict[str, Any]]] = None) -> Iterator[ChunkRecord]:
+        for row in range(self.count):
+            yield self.record(row, updates)
+
+    def update(self, row: int, metadata: Dict[str, Any]):
+        self.updates.setdefault(row, {}).update(metadata)
+
+    def close(self):
+        pass
+
+
+def _read_blob(path: Path):
+    """Memory-map a blob file (an empty file cannot be mapped)"""
+    if path.stat().st_size == 0:
+        return b""
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _text(blob, offset, length) -> str:
+    offset = int(offset)
+    return blob[offset:offset + int(length)].decode('utf-8')
+
+
+def _stored(value: Optional[int]) -> int:
+    return MISSING if value is None else value
+
+
+def _optional(value) -> Optional[int]:
+    value = int(value)
+    return None if value == MISSING else value
@@ -0,0 +1,224 @@
+"""
+Incremental text chunker that turns streamed text into DocumentChunks
+"""
+
+import re
+import hashlib
+from typing import List, Dict, Any, Optional, NamedTuple
+from loguru import logger
+
+from app.models.document import DocumentChunk
+from app.utils.tokens import estimate_tokens, CHARS_PER_TOKEN
+
+# Bump when chunk boundaries or chunk metadata change so ingested documents are re-chunked
+CHUNKER_VERSION = 3
+
+# Greedy prefix so a forward match lands on the LAST sentence end in the window:
+# terminal punctuation followed by whitespace, or a blank line
+_LAST_SENTENCE_END = re.compile(r"(?s).*(?:[.!?](?=\s)|\n[^\S\n]*\n)")
+_SENTENCE_END = re.compile(r"[.!?](?=\s)|\n[^\S\n]*\n")
+_LAST_WHITESPACE = re.compile(r"(?s).*\s")
+_NON_SPACE = re.compile(r"\S")
+
+
+class PageText(NamedTuple):
+    """A piece of extracted text and, for paged formats, where it came from"""
+    text: str
+    page_number: Optional[int] = None
+    extractor: Optional[str] = None
+
+
+class TextChunker:
+    """
+    Single-pass, sentence-aware chunker sized in estimated tokens
+
+    Text is fed page by page with feed(); complete chunks are returned as soon
+    as enough text has arrived, and finish() flushes the rest. Each chunk ends
+    at the last sentence boundary that fits its token budget (falling back to
+    whitespace for run-on text) and the next one starts at the first sentence
+    boundary inside the overlap window. Boundaries are found with a constant
+    number of regex scans per chunk, and start_char/end_char are exact offsets
+    into the fed text, so content == text[start_char:end_char].
+
+    When pages are fed with a page number, each chunk records the pages it
+    spans and the extractor that produced each of them.
+    """
+
+    def __init__(self, source: str, metadata: Dict[str, Any], chunk_size: int, chunk_overlap: int):
+        self.source = source
+        self.metadata = metadata
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_overlap = max(0, min(chunk_overlap, self.chunk_size - 1))
+
+        # Content-addressed IDs stay stable across requests for the same document and
+        # chunking configuration, and change whenever the chunk boundaries would
+        if metadata.get('content_hash'):
+            id_key = f"{metadata['content_hash']}|v{CHUNKER_VERSION}|{self.chunk_size}|{self.chunk_overlap}"
+            self.id_prefix = hashlib.sha256(id_key.encode("utf-8")).hexdigest()[:16]
+        else:
+            self.id_prefix = str(hash(source))
+
+        # Character windows corresponding to the token budgets
+        self._window_chars = self.chunk_size * CHARS_PER_TOKEN
+        self._overlap_chars = self.chunk_overlap * CHARS_PER_TOKEN
+
+        self._has_text = False
+        self._buffer = ""        # Text from the start of the next chunk onwards
+        self._buffer_start = 0   # Absolute offset of _buffer[0]
+        self._chunk_start = 0    # Absolute offset where the next chunk starts
+        self._prev_end = 0       # Absolute offset where the previous chunk ended
+        self._chunk_id = 0
+        self._pages: List[tuple] = []  # (absolute start, page number, extractor) of buffered pages
+
+    def feed(self, text: str, page_number: Optional[int] = None, extractor: Optional[str] = None) -> List[DocumentChunk]:
+        """Add text and return the chunks it completed"""
+        self._has_text = self._has_text or bool(text.strip())
+        if page_number is not None:
+            self._pages.append((self._buffer_end, page_number, extractor))
+        self._buffer += text
+
+        # Only cut once a full window plus one lookahead character is available,
+        # so boundaries never depend on how the text was split into feeds
+        chunks = []
+        while self._buffer_end - self._chunk_start > self._window_chars:
+            chunk = self._take_chunk(final=False)
+            if chunk is None:
+                break
+            chunks.append(chunk)
+
+        self._compact()
+        return chunks
+
+    def finish(self) -> List[DocumentChunk]:
+        """Flush the remaining text and return the final chunks"""
+        if not self._has_text:
+            logger.warning(f"No text content extracted from {self.source}")
+            return []
+
+        chunks = []
+        while True:
+            chunk = self._take_chunk(final=True)
+            if chunk is None:
+                break
+            chunks.append(chunk)
+
+        self._buffer = ""
+        logger.info(f"Created {self._chunk_id} chunks from document {self.metadata.get('filename', self.source)}")
+        return chunks
+
+    @property
+    def _buffer_end(self) -> int:
+        return self._buffer_start + len(self._buffer)
+
+    def _local(self, offset: int) -> int:
+        return offset - self._buffer_start
+
+    def _take_chunk(self, final: bool) -> Optional[DocumentChunk]:
+        """Cut the next chunk from the buffer and advance past it, minus the overlap"""
+        # Skip leading whitespace
+        match = _NON_SPACE.search(self._buffer, self._local(self._chunk_start))
+        if match is None:
+            self._chunk_start = self._buffer_end
+            return None
+        start = self._buffer_start + match.start()
+        self._chunk_start = start
+
+        limit = start + self._window_chars
+        if not final and limit >= self._buffer_end:
+            # Wait for more text so the window is complete
+            return None
+
+        if final and estimate_tokens(self._buffer[self._local(start):]) <= self.chunk_size:
+            end = self._buffer_end
+        else:
+            end = self._find_end(start, min(limit, self._buffer_end))
+
+        # The character window is an upper bound; shrink if word-dense text has more tokens
+        tokens = estimate_tokens(self._buffer[self._local(start):self._local(end)])
+        while tokens > self.chunk_size and end - start > 1:
+            limit = start + max(1, (end - start) * self.chunk_size // tokens)
+            end = self._find_end(start, limit)
+            tokens = estimate_tokens(self._buffer[self._local(start):self._local(end)])
+
+        reached_end = end == self._buffer_end
+        content = self._buffer[self._local(start):self._local(end)].rstrip()
+        end = start + len(content)
+        chunk = self._make_chunk(content, start, end, tokens)
+        self._prev_end = end
+
+        # The last chunk of the document has nothing left to overlap into
+        self._chunk_start = self._buffer_end if final and reached_end else self._overlap_start(start, end)
+        return chunk
+
+    def _find_end(self, start: int, limit: int) -> int:
+        """Find where a chunk starting at start should end, no later than limit"""
+        # Each chunk must add text beyond the previous one, not just repeat the overlap
+        floor = self._local(max(start, self._prev_end))
+        for pattern in (_LAST_SENTENCE_END, _LAST_WHITESPACE):
+            match = pattern.match(self._buffer, floor, self._local(limit))
+            if match is not None and _NON_SPACE.search(self._buffer, floor, match.end()) is not None:
+                return self._buffer_start + match.end()
+
+        # A single token-dense run with no boundary at all: hard split
+        return limit
+
+    def _overlap_start(self, start: int, end: int) -> int:
+        """Start of the next chunk: the first sentence boundary inside the overlap window"""
+        if self._overlap_chars > 0:
+            window_start = max(start + 1, end - self._overlap_chars)
+            match = _SENTENCE_END.search(self._buffer, self._local(window_start), self._local(end))
+            if match is not None and self._buffer_start + match.end() < end:
+                return self._buffer_start + match.end()
+        return end
+
+    def _compact(self):
+        """Drop buffered text that no future chunk can reference"""
+        cut = self._local(self._chunk_start)
+        if cut > 0:
+            self._buffer = self._buffer[cut:]
+            self._buffer_start = self._chunk_start
+
+        # Keep the page the buffer starts in and every page after it
+        first = 0
+        while first + 1 < len(self._pages) and self._pages[first + 1][0] <= self._buffer_start:
+            first += 1
+        if first:
+            del self._pages[:first]
+
+    def _make_chunk(self, content: str, start_char: int, end_char: int, tokens: int) -> DocumentChunk:
+        """Build a DocumentChunk for the text between two absolute offsets"""
+        chunk = DocumentChunk(
+            id=f"{self.id_prefix}_{self._chunk_id}",
+            content=content,
+            source=self.source,
+            chunk_index=self._chunk_id,
+            start_char=start_char,
+            end_char=end_char,
+            metadata={
+                **self.metadata,
+                'chunk_id': self._chunk_id,
+                'chunk_size': len(content),
+                'token_count': tokens,
+                **self._page_metadata(start_char, end_char)
+            }
+        )
+        self._chunk_id += 1
+        return chunk
+
+    def _page_metadata(self, start_char: int, end_char: int) -> Dict[str, Any]:
+        """Pages a chunk spans and the extractor that produced each of them"""
+        covered = []
+        for index, (page_start, page_number, extractor) in enumerate(self._pages):
+            if page_start >= end_char:
+                break
+            next_start = self._pages[index + 1][0] if index + 1 < len(self._pages) else None
+            if next_start is None or next_start > start_char:
+                covered.append((page_number, extractor))
+
+        if not covered:
+            return {}
+        return {
+            'page_start': covered[0][0],
+            'page_end': covered[-1][0],
+            'page_extractors': ",".join(f"{number}:{extractor}" for number, extractor in covered)
+        }
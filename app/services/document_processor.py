@@ -7,45 +7,165 @@ import aiofiles
 import httpx
 import tempfile
 import os
-from typing import List, Dict, Any, Optional
+import io
+from dataclasses import dataclass
+from collections import deque
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
 from pathlib import Path
 from loguru import logger
 import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 # Document processing imports
-import fitz  # PyMuPDF
-import pdfplumber
-from docx import Document as DocxDocument
-import textstat
 from bs4 import BeautifulSoup
 
 from app.core.config import settings
 from app.core.exceptions import DocumentProcessingError, DocumentDownloadError
 from app.models.document import DocumentChunk
+from app.services.ingestion_manifest import hash_file
+from app.services.chunking import TextChunker, PageText
+from app.services.ingestion_pipeline import run_ingestion_pipeline
+from app.services.chunk_enrichment import ChunkEnrichmentService
+from app.services.text_cache import ExtractedTextCache
+from app.services.docx_extraction import extract_docx_text, extract_docx_text_python_docx
+from app.services.pdf_extraction import (
+    count_pdf_pages,
+    extract_pages_pymupdf,
+    extract_pages_pdfplumber
+)
+
+READ_BLOCK_SIZE = 1024 * 1024  # Stream uploads and downloads 1 MB at a time
+
+
+@dataclass
+class UploadedDocument:
+    """An uploaded document held in memory, or spilled to a temporary file when large"""
+    filename: str
+    size_bytes: int
+    content_hash: str
+    content: Optional[bytes] = None
+    spill_path: Optional[str] = None
+    
+    def cleanup(self):
+        """Remove the spill file, if any"""
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.unlink(self.spill_path)
+            self.spill_path = None
 
 
 class DocumentProcessor:
     """Service for processing documents from URLs"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        vector_store=None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        enrichment_service: Optional[ChunkEnrichmentService] = None,
+        text_cache: Optional[ExtractedTextCache] = None
+    ):
+        self.vector_store = vector_store
+        self.enrichment_service = enrichment_service
+        self.text_cache = text_cache
+        self.http_client = http_client
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.extraction_workers = settings.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1
+        self.min_page_chars = settings.PDF_MIN_PAGE_CHARS
         self.max_size_bytes = settings.MAX_DOCUMENT_SIZE_MB * 1024 * 1024
+        self.spill_threshold_bytes = settings.UPLOAD_SPILL_THRESHOLD_MB * 1024 * 1024
         self.supported_formats = settings.supported_formats_list
-        self.chunk_size = settings.CHUNK_SIZE
-        self.chunk_overlap = settings.CHUNK_OVERLAP
+        self.chunk_size = settings.CHUNK_SIZE_TOKENS
+        self.chunk_overlap = settings.CHUNK_OVERLAP_TOKENS
+    
+    async def read_upload(self, upload) -> UploadedDocument:
+        """
+        Read an uploaded file in blocks, enforcing the size limit as it streams
+        
+        Small uploads stay in memory; uploads larger than UPLOAD_SPILL_THRESHOLD_MB
+        are spilled to a temporary file that is removed after processing.
+        
+        Args:
+            upload: A FastAPI/Starlette UploadFile
+            
+        Returns:
+            UploadedDocument with the content hash computed during the read
+        """
+        async def blocks() -> AsyncIterator[bytes]:
+            while block := await upload.read(READ_BLOCK_SIZE):
+                yield block
+        
+        return await self._spool(blocks(), upload.filename or "")
+    
+    async def _spool(self, blocks: AsyncIterator[bytes], filename: str) -> UploadedDocument:
+        """
+        Buffer a stream of blocks, hashing it and enforcing MAX_DOCUMENT_SIZE_MB as it arrives
+        
+        Streams stay in memory up to UPLOAD_SPILL_THRESHOLD_MB and continue in a
+        temporary file beyond it; the stream is abandoned as soon as it passes
+        the size limit. File writes run in a worker thread.
+        """
+        digest = hashlib.sha256()
+        buffer = io.BytesIO()
+        spill_file = None
+        size = 0
+        
+        try:
+            async for block in blocks:
+                size += len(block)
+                if size > self.max_size_bytes:
+                    raise DocumentDownloadError(
+                        f"Document too large: {filename} exceeds {settings.MAX_DOCUMENT_SIZE_MB} MB"
+                    )
+                
+                digest.update(block)
+                
+                if spill_file is None and size > self.spill_threshold_bytes:
+                    # Move what we have so far to disk and keep streaming there
+                    spill_file = tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix)
+                    await asyncio.to_thread(spill_file.write, buffer.getvalue())
+                    buffer = None
+                
+                if spill_file is not None:
+                    await asyncio.to_thread(spill_file.write, block)
+                else:
+                    buffer.write(block)
+            
+        except BaseException:
+            if spill_file is not None:
+                spill_file.close()
+                os.unlink(spill_file.name)
+            raise
+        
+        if spill_file is not None:
+            await asyncio.to_thread(spill_file.close)
+            return UploadedDocument(
+                filename=filename,
+                size_bytes=size,
+                content_hash=digest.hexdigest(),
+                spill_path=spill_file.name
+            )
+        
+        return UploadedDocument(
+            filename=filename,
+            size_bytes=size,
+            content_hash=digest.hexdigest(),
+            content=buffer.getvalue()
+        )
     
-    async def process_documents(self, document_urls: List[str]) -> List[DocumentChunk]:
+    async def process_documents(self, document_urls: List[Union[str, UploadedDocument]]) -> List[DocumentChunk]:
         """
         Process multiple documents concurrently
         
         Args:
-            document_urls: List of document URLs to process
+            document_urls: List of document URLs or uploaded documents to process
             
         Returns:
             List of DocumentChunk objects
         """
         semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_DOWNLOADS)
         
-        async def process_single_document(url: str) -> List[DocumentChunk]:
+        async def process_single_document(url: Union[str, UploadedDocument]) -> List[DocumentChunk]:
             async with semaphore:
                 return await self._process_single_document(url)
         
@@ -64,24 +184,68 @@ class DocumentProcessor:
         logger.info(f"Successfully processed {len(all_chunks)} chunks from {len(document_urls)} documents")
         return all_chunks
     
-    async def _process_single_document(self, url: str) -> List[DocumentChunk]:
-        """Process a single document from URL"""
+    async def _process_single_document(self, source: Union[str, UploadedDocument]) -> List[DocumentChunk]:
+        """Process a single document from URL or upload"""
         start_time = time.time()
+        url = source.filename if isinstance(source, UploadedDocument) else source
+        cleanup_path = None
+        cached_pages = None
         
         try:
-            # Download document
-            logger.info(f"Downloading document from: {url}")
-            file_path, metadata = await self._download_document(url)
+            if isinstance(source, UploadedDocument):
+                file_path, content = source.spill_path, source.content
+                cleanup_path = source.spill_path
+                metadata = self._upload_metadata(source)
+            else:
+                # Download document, revalidating any cached extraction
+                logger.info(f"Downloading document from: {url}")
+                cache_entry = self.text_cache.get(url) if self.text_cache is not None else None
+                file_path, content, metadata = await self._download_document(url, cache_entry)
+                if file_path is None and content is None:
+                    cached_pages = await self.text_cache.read_pages(url)
+                    if cached_pages is None:
+                        # Evicted by another request since the conditional request was sent
+                        logger.info(f"Cached text for {url} is gone, downloading it again")
+                        file_path, content, metadata = await self._download_document(url)
+                # Only remove files we downloaded, never a caller's local file
+                cleanup_path = file_path if file_path != url else None
             
-            # Extract text based on file format
-            logger.info(f"Extracting text from: {metadata['filename']}")
-            text_content = await self._extract_text(file_path, metadata['format'])
+            validators = metadata.pop('validators', None)
             
-            # Clean up temporary file
-            os.unlink(file_path)
+            # Resolve documents that were already ingested straight to their stored chunks
+            known_chunks = await self._lookup_known_document(metadata)
+            if known_chunks is not None:
+                logger.info(f"Document {metadata['filename']} already ingested, reusing {len(known_chunks)} chunks")
+                return known_chunks
+            
+            if cached_pages is not None:
+                # Not modified since it was cached: reuse the extracted text
+                logger.info(f"Using cached text for: {metadata['filename']}")
+                pages = _iter_pages(cached_pages)
+            else:
+                logger.info(f"Extracting text from: {metadata['filename']}")
+                pages = self._iter_text(file_path, metadata['format'], content)
+                # Without an ETag or Last-Modified an entry could never be revalidated
+                if validators and any(validators.values()) and self.text_cache is not None:
+                    pages = self.text_cache.capture(url, validators, dict(metadata), pages)
             
-            # Chunk the text
-            chunks = self._chunk_text(text_content, url, metadata)
+            # Extract, chunk and store as overlapping stages
+            chunks = await run_ingestion_pipeline(
+                pages,
+                TextChunker(url, metadata, self.chunk_size, self.chunk_overlap),
+                store_batch=self._store_batch if self.vector_store is not None else None,
+                batch_size=settings.EMBEDDING_BATCH_SIZE,
+                queue_size=settings.INGESTION_QUEUE_SIZE,
+                store_concurrency=settings.INGESTION_STORE_CONCURRENCY
+            )
+            
+            # Persist the index and record the document once every batch is in
+            if self.vector_store is not None and chunks:
+                await self.vector_store.commit_document(chunks)
+                
+                # Optional metrics are computed in the background, off the answer path
+                if self.enrichment_service is not None:
+                    self.enrichment_service.submit(chunks)
             
             processing_time = time.time() - start_time
             metadata['processing_time'] = processing_time
@@ -93,9 +257,54 @@ class DocumentProcessor:
         except Exception as e:
             logger.error(f"Failed to process document {url}: {str(e)}")
             raise DocumentProcessingError(f"Failed to process document {url}: {str(e)}")
+        
+        finally:
+            # Clean up temporary file
+            if cleanup_path and os.path.exists(cleanup_path):
+                os.unlink(cleanup_path)
     
-    async def _download_document(self, url: str) -> tuple[str, Dict[str, Any]]:
-        """Process document from URL or local file path and return file path and metadata"""
+    async def _store_batch(self, chunks: List[DocumentChunk]):
+        """Embed and store one batch of chunks from the ingestion pipeline"""
+        await self.vector_store.store_documents(chunks, commit=False)
+    
+    def _upload_metadata(self, upload: UploadedDocument) -> Dict[str, Any]:
+        """Build document metadata for an uploaded file"""
+        file_format = self._determine_format(upload.filename, "")
+        
+        if file_format not in self.supported_formats:
+            raise DocumentDownloadError(f"Unsupported file format: {file_format}")
+        
+        return {
+            'filename': upload.filename,
+            'format': file_format,
+            'size_bytes': upload.size_bytes,
+            'content_type': f"application/{file_format}",
+            'url': upload.filename,
+            'content_hash': upload.content_hash
+        }
+    
+    async def _download_document(
+        self,
+        url: str,
+        cache_entry: Optional[Dict[str, Any]] = None
+    ) -> tuple[Optional[str], Optional[bytes], Dict[str, Any]]:
+        """
+        Process document from URL or local file path
+        
+        Downloads are streamed: the body is hashed and size-checked block by
+        block, kept in memory when small and spilled to a temporary file when
+        large, so an oversized or chunked response is cut off at the limit
+        instead of being buffered whole.
+        
+        With a text cache entry the request is conditional; if the server
+        answers 304 Not Modified, neither a file nor content is returned and
+        the metadata is the cached copy. Downloaded documents carry their
+        ETag/Last-Modified values in metadata['validators'].
+        
+        Returns:
+            Tuple of (file path, in-memory content, metadata); at most one of
+            file path and content is set
+        """
         
         try:
             # Check if this is a local file path
@@ -120,49 +329,83 @@ class DocumentProcessor:
                     'format': file_format,
                     'size_bytes': file_size,
                     'content_type': f"application/{file_format}",
-                    'url': url
+                    'url': url,
+                    'content_hash': await asyncio.to_thread(hash_file, file_path)
                 }
                 
-                return file_path, metadata
+                return file_path, None, metadata
                 
             # If not a local file, treat as URL
+            if self.http_client is not None:
+                # Shared keep-alive client from the application lifespan
+                return await self._stream_download(self.http_client, url, cache_entry)
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, follow_redirects=True)
-                response.raise_for_status()
-                
-                # Check file size
-                content_length = response.headers.get('content-length')
-                if content_length and int(content_length) > self.max_size_bytes:
-                    raise DocumentDownloadError(f"Document too large: {content_length} bytes")
-                
-                # Determine file format
-                content_type = response.headers.get('content-type', '').lower()
-                filename = self._extract_filename_from_url(url, content_type)
-                file_format = self._determine_format(filename, content_type)
-                
-                if file_format not in self.supported_formats:
-                    raise DocumentDownloadError(f"Unsupported file format: {file_format}")
-                
-                # Save to temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_format}") as temp_file:
-                    temp_file.write(response.content)
-                    temp_path = temp_file.name
-                
-                metadata = {
-                    'filename': filename,
-                    'format': file_format,
-                    'size_bytes': len(response.content),
-                    'content_type': content_type,
-                    'url': url
-                }
-                
-                return temp_path, metadata
-                
+                return await self._stream_download(client, url, cache_entry)
+            
+        except DocumentDownloadError:
+            raise
         except httpx.HTTPError as e:
             raise DocumentDownloadError(f"Failed to download document: {str(e)}")
         except Exception as e:
             raise DocumentDownloadError(f"Unexpected error downloading document: {str(e)}")
     
+    async def _stream_download(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        cache_entry: Optional[Dict[str, Any]]
+    ) -> tuple[Optional[str], Optional[bytes], Dict[str, Any]]:
+        """Stream a URL into memory or a spill file, validating headers before reading the body"""
+        headers = ExtractedTextCache.conditional_headers(cache_entry) if cache_entry else {}
+        
+        async with client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            if response.status_code == 304 and cache_entry is not None:
+                logger.info(f"Document not modified since cached: {url}")
+                return None, None, dict(cache_entry['metadata'])
+            response.raise_for_status()
+            
+            # Reject early when the server declares an oversized body
+            content_length = response.headers.get('content-length')
+            if content_length and int(content_length) > self.max_size_bytes:
+                raise DocumentDownloadError(f"Document too large: {content_length} bytes")
+            
+            # Determine file format
+            content_type = response.headers.get('content-type', '').lower()
+            filename = self._extract_filename_from_url(url, content_type)
+            file_format = self._determine_format(filename, content_type)
+            
+            if file_format not in self.supported_formats:
+                raise DocumentDownloadError(f"Unsupported file format: {file_format}")
+            
+            # The declared length is not trusted; the cap is enforced on the bytes received
+            body = await self._spool(response.aiter_bytes(READ_BLOCK_SIZE), f"{Path(filename).stem}.{file_format}")
+        
+        metadata = {
+            'filename': filename,
+            'format': file_format,
+            'size_bytes': body.size_bytes,
+            'content_type': content_type,
+            'url': url,
+            'content_hash': body.content_hash,
+            'validators': {
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified')
+            }
+        }
+        
+        return body.spill_path, body.content, metadata
+    
+    async def _lookup_known_document(self, metadata: Dict[str, Any]) -> Optional[List[DocumentChunk]]:
+        """Return the stored chunks for a document whose content hash is already in the manifest"""
+        if self.vector_store is None or not metadata.get('content_hash'):
+            return None
+        
+        try:
+            return await self.vector_store.lookup_document(metadata['content_hash'])
+        except Exception as e:
+            logger.warning(f"Ingestion manifest lookup failed, re-processing document: {str(e)}")
+            return None
+    
     def _extract_filename_from_url(self, url: str, content_type: str) -> str:
         """Extract filename from URL or generate one based on content type"""
         path = Path(url)
@@ -196,75 +439,170 @@ class DocumentProcessor:
         else:
             return 'txt'
     
-    async def _extract_text(self, file_path: str, file_format: str) -> str:
-        """Extract text from document based on format"""
+    async def _extract_text(self, file_path: Optional[str], file_format: str, content: Optional[bytes] = None) -> str:
+        """Extract text from document based on format, reading from memory when content is given"""
         
         try:
             if file_format == 'pdf':
-                return await self._extract_pdf_text(file_path)
+                return await self._extract_pdf_text(file_path, content)
             elif file_format in ['docx', 'doc']:
-                return await self._extract_docx_text(file_path)
+                return await self._extract_docx_text(file_path, content)
             elif file_format == 'html':
-                return await self._extract_html_text(file_path)
+                return await self._extract_html_text(file_path, content)
             elif file_format == 'txt':
-                return await self._extract_txt_text(file_path)
+                return await self._extract_txt_text(file_path, content)
             else:
                 raise DocumentProcessingError(f"Unsupported format for text extraction: {file_format}")
                 
         except Exception as e:
             raise DocumentProcessingError(f"Failed to extract text from {file_format} file: {str(e)}")
     
-    async def _extract_pdf_text(self, file_path: str) -> str:
+    async def _iter_text(self, file_path: Optional[str], file_format: str, content: Optional[bytes] = None) -> AsyncIterator[PageText]:
+        """Yield document text incrementally: page by page for PDFs, in one piece otherwise"""
+        if file_format == 'pdf':
+            async for page in self._iter_pdf_text(file_path, content):
+                yield page
+        else:
+            yield PageText(await self._extract_text(file_path, file_format, content))
+    
+    async def _extract_pdf_text(self, file_path: Optional[str], content: Optional[bytes] = None) -> str:
         """Extract text from PDF using multiple methods for best results"""
-        text_content = ""
-        
+        page_texts = [page.text async for page in self._iter_pdf_text(file_path, content)]
+        return "".join(page_texts).strip()
+    
+    async def _iter_pdf_text(self, file_path: Optional[str], content: Optional[bytes] = None) -> AsyncIterator[PageText]:
+        """Yield PDF pages in order as they are extracted"""
         try:
-            # Method 1: PyMuPDF (fast and good for most PDFs)
-            doc = fitz.open(file_path)
-            for page in doc:
-                text_content += page.get_text() + "\n"
-            doc.close()
+            source = content if content is not None else file_path
+            fallback_pages = 0
             
-            # If PyMuPDF didn't extract much text, try pdfplumber
-            if len(text_content.strip()) < 100:
-                logger.info("PyMuPDF extracted minimal text, trying pdfplumber...")
-                with pdfplumber.open(file_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content += page_text + "\n"
+            async for page in self._iter_pdf_pages(source):
+                if page.extractor == 'pdfplumber':
+                    fallback_pages += 1
+                yield page
             
-            return text_content.strip()
+            if fallback_pages:
+                logger.info(f"Used pdfplumber for {fallback_pages} pages with little PyMuPDF text")
             
         except Exception as e:
             raise DocumentProcessingError(f"Failed to extract PDF text: {str(e)}")
     
-    async def _extract_docx_text(self, file_path: str) -> str:
-        """Extract text from DOCX file"""
+    async def _iter_pdf_pages(self, source: Union[str, bytes]) -> AsyncIterator[PageText]:
+        """
+        Extract per-page text in the process pool
+        
+        The page range is split into PDF_PAGES_PER_TASK slices that run in
+        parallel; pages are yielded in order as their slice completes. At most
+        two slices per worker are in flight, so a slow consumer bounds memory.
+        An in-memory PDF larger than UPLOAD_SPILL_THRESHOLD_MB, or one split
+        into several slices, is written to a temporary file first, so each task
+        sends the workers a path instead of pickling the whole document; a
+        small single-slice PDF goes to its worker as bytes.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        step = max(1, settings.PDF_PAGES_PER_TASK)
+        
+        spill_path = None
+        if isinstance(source, bytes) and len(source) > self.spill_threshold_bytes:
+            source = spill_path = await asyncio.to_thread(_spill_to_file, source, ".pdf")
+        
+        in_flight = deque()
+        
         try:
-            doc = DocxDocument(file_path)
-            text_content = ""
+            page_count = await loop.run_in_executor(executor, count_pdf_pages, source)
+            if isinstance(source, bytes) and page_count > step:
+                source = spill_path = await asyncio.to_thread(_spill_to_file, source, ".pdf")
+            max_in_flight = 2 * self.extraction_workers
             
-            for paragraph in doc.paragraphs:
-                text_content += paragraph.text + "\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text_content += cell.text + " "
-                    text_content += "\n"
-            
-            return text_content.strip()
+            ranges = deque((start, min(start + step, page_count)) for start in range(0, page_count, step))
             
+            while ranges or in_flight:
+                while ranges and len(in_flight) < max_in_flight:
+                    start, end = ranges.popleft()
+                    in_flight.append(asyncio.ensure_future(self._extract_pdf_slice(source, start, end)))
+                
+                for page in await in_flight.popleft():
+                    yield page
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if spill_path is not None:
+                try:
+                    os.unlink(spill_path)
+                except OSError as e:
+                    # Still open in a worker (e.g. on Windows); left to the OS temp cleanup
+                    logger.debug(f"Could not remove {spill_path}: {str(e)}")
+    
+    async def _extract_pdf_slice(self, source: Union[str, bytes], start: int, end: int) -> List[PageText]:
+        """
+        Extract pages [start, end) with PyMuPDF, retrying sparse pages with pdfplumber
+        
+        Pages where PyMuPDF recovers fewer than PDF_MIN_PAGE_CHARS characters
+        (scans, unusual font encodings) are re-parsed with pdfplumber, and
+        whichever extractor found more text wins. Only those pages pay for the
+        slower parser, and slices do their fallback concurrently.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        
+        texts = await loop.run_in_executor(executor, extract_pages_pymupdf, source, start, end)
+        extractors = ['pymupdf'] * len(texts)
+        
+        weak = [index for index, text in enumerate(texts) if len(text.strip()) < self.min_page_chars]
+        if weak:
+            fallback_texts = await loop.run_in_executor(
+                executor, extract_pages_pdfplumber, source, [start + index for index in weak]
+            )
+            for index, fallback_text in zip(weak, fallback_texts):
+                if len(fallback_text.strip()) > len(texts[index].strip()):
+                    texts[index] = fallback_text
+                    extractors[index] = 'pdfplumber'
+        
+        return [
+            PageText(text + "\n", page_number=start + index + 1, extractor=extractor)
+            for index, (text, extractor) in enumerate(zip(texts, extractors))
+        ]
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the extraction process pool, creating it on first use"""
+        if self.executor is None:
+            # Forking a process that already runs threads (event loop executors, HTTP
+            # clients) can copy held locks into the child; forkserver and spawn start clean
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.extraction_workers,
+                mp_context=multiprocessing.get_context(start_method)
+            )
+        return self.executor
+    
+    def close(self):
+        """Shut down the extraction process pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+    
+    async def _extract_docx_text(self, file_path: Optional[str], content: Optional[bytes] = None) -> str:
+        """Extract text from DOCX file in a worker thread, streaming its XML"""
+        source = content if content is not None else file_path
+        try:
+            return await asyncio.to_thread(extract_docx_text, source)
+        except Exception as e:
+            logger.warning(f"Streaming DOCX extraction failed, falling back to python-docx: {str(e)}")
+        
+        try:
+            return await asyncio.to_thread(extract_docx_text_python_docx, source)
         except Exception as e:
             raise DocumentProcessingError(f"Failed to extract DOCX text: {str(e)}")
     
-    async def _extract_html_text(self, file_path: str) -> str:
+    async def _extract_html_text(self, file_path: Optional[str], content: Optional[bytes] = None) -> str:
         """Extract text from HTML file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                html_content = file.read()
+            if content is not None:
+                html_content = content.decode('utf-8')
+            else:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    html_content = file.read()
             
             soup = BeautifulSoup(html_content, 'html.parser')
             
@@ -285,8 +623,14 @@ class DocumentProcessor:
         except Exception as e:
             raise DocumentProcessingError(f"Failed to extract HTML text: {str(e)}")
     
-    async def _extract_txt_text(self, file_path: str) -> str:
+    async def _extract_txt_text(self, file_path: Optional[str], content: Optional[bytes] = None) -> str:
         """Extract text from plain text file"""
+        if content is not None:
+            try:
+                return content.decode('utf-8')
+            except UnicodeDecodeError:
+                return content.decode('latin-1')
+        
         try:
             async with aiofiles.open(file_path, 'r', encoding='utf-8') as file:
                 return await file.read()
@@ -300,76 +644,18 @@ class DocumentProcessor:
     
     def _chunk_text(self, text: str, source: str, metadata: Dict[str, Any]) -> List[DocumentChunk]:
         """Split text into chunks for processing"""
-        
-        if not text.strip():
-            logger.warning(f"No text content extracted from {source}")
-            return []
-        
-        # Simple sentence-aware chunking
-        sentences = text.split('. ')
-        chunks = []
-        current_chunk = ""
-        chunk_id = 0
-        char_position = 0
-        
-        for sentence in sentences:
-            # Add sentence to current chunk
-            test_chunk = current_chunk + sentence + ". "
-            
-            if len(test_chunk) <= self.chunk_size:
-                current_chunk = test_chunk
-            else:
-                # Current chunk is full, save it and start new one
-                if current_chunk.strip():
-                    start_char = char_position - len(current_chunk)
-                    end_char = char_position
-                    
-                    chunks.append(DocumentChunk(
-                        id=f"{hash(source)}_{chunk_id}",
-                        content=current_chunk.strip(),
-                        source=source,
-                        chunk_index=chunk_id,
-                        start_char=start_char,
-                        end_char=end_char,
-                        metadata={
-                            **metadata,
-                            'chunk_id': chunk_id,
-                            'chunk_size': len(current_chunk),
-                            'readability_score': textstat.flesch_reading_ease(current_chunk)
-                        }
-                    ))
-                    chunk_id += 1
-                
-                # Start new chunk with overlap
-                if len(chunks) > 0 and self.chunk_overlap > 0:
-                    # Take last few sentences for overlap
-                    overlap_text = '. '.join(current_chunk.split('. ')[-2:])
-                    current_chunk = overlap_text + ". " + sentence + ". "
-                else:
-                    current_chunk = sentence + ". "
-            
-            # Update character position
-            char_position += len(sentence) + 2  # +2 for the '. ' separator
-        
-        # Add final chunk
-        if current_chunk.strip():
-            start_char = char_position - len(current_chunk)
-            end_char = char_position
-            
-            chunks.append(DocumentChunk(
-                id=f"{hash(source)}_{chunk_id}",
-                content=current_chunk.strip(),
-                source=source,
-                chunk_index=chunk_id,
-                start_char=start_char,
-                end_char=end_char,
-                metadata={
-                    **metadata,
-                    'chunk_id': chunk_id,
-                    'chunk_size': len(current_chunk),
-                    'readability_score': textstat.flesch_reading_ease(current_chunk)
-                }
-            ))
-        
-        logger.info(f"Created {len(chunks)} chunks from document {metadata.get('filename', source)}")
-        return chunks
\ No newline at end of file
+        chunker = TextChunker(source, metadata, self.chunk_size, self.chunk_overlap)
+        return chunker.feed(text) + chunker.finish()
+
+
+def _spill_to_file(content: bytes, suffix: str) -> str:
+    """Write content to a new temporary file and return its path"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as spill_file:
+        spill_file.write(content)
+    return spill_file.name
+
+
+async def _iter_pages(pages: List[PageText]) -> AsyncIterator[PageText]:
+    """Yield already extracted pages"""
+    for page in pages:
+        yield page
@@ -0,0 +1,124 @@
+"""
+Streaming DOCX text extraction straight from the package XML
+
+Reads word/document.xml with iterparse instead of building the python-docx
+object model, so large documents are handled in one pass with little memory.
+Functions here are synchronous and meant to run in a worker thread.
+"""
+
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List, Union
+
+DocxSource = Union[str, bytes]
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P, _T, _TAB, _BR, _CR = f"{_W}p", f"{_W}t", f"{_W}tab", f"{_W}br", f"{_W}cr"
+_TBL, _TR, _TC = f"{_W}tbl", f"{_W}tr", f"{_W}tc"
+_VMERGE, _VAL = f"{_W}tcPr/{_W}vMerge", f"{_W}val"
+
+CELL_SEPARATOR = " | "
+
+
+class _Table:
+    """Parse state for one (possibly nested) table"""
+
+    def __init__(self):
+        self.rows: List[str] = []
+        self.previous_row = None
+        self.cells: List[str] = []
+        self.cell_parts: List[str] = []
+
+
+def extract_docx_text(source: DocxSource) -> str:
+    """
+    Extract the body text of a DOCX file in document order
+
+    Paragraphs become lines; each table row becomes one line of cell texts
+    joined by CELL_SEPARATOR. Cells spanning several grid columns are emitted
+    once, vertically merged continuation cells are skipped, and a row that
+    repeats the previous row verbatim is dropped, so merged cells never
+    duplicate text. Nested tables are flattened into their parent cell.
+    """
+    lines: List[str] = []
+    paragraphs: List[List[str]] = []   # Runs of the paragraphs currently open
+    tables: List[_Table] = []          # Tables currently open, innermost last
+
+    with zipfile.ZipFile(io.BytesIO(source) if isinstance(source, bytes) else source) as package:
+        with package.open("word/document.xml") as document_xml:
+            for event, elem in ET.iterparse(document_xml, events=("start", "end")):
+                tag = elem.tag
+
+                if event == "start":
+                    if tag == _P:
+                        paragraphs.append([])
+                    elif tag == _TBL:
+                        tables.append(_Table())
+                    elif tag == _TR and tables:
+                        tables[-1].cells = []
+                    elif tag == _TC and tables:
+                        tables[-1].cell_parts = []
+                    continue
+
+                if tag == _T and paragraphs:
+                    paragraphs[-1].append(elem.text or "")
+                elif tag == _TAB and paragraphs:
+                    paragraphs[-1].append("\t")
+                elif tag in (_BR, _CR) and paragraphs:
+                    paragraphs[-1].append("\n")
+
+                elif tag == _P:
+                    text = "".join(paragraphs.pop()).strip()
+                    if tables:
+                        if text:
+                            tables[-1].cell_parts.append(text)
+                    else:
+                        lines.append(text)
+                    elem.clear()
+
+                elif tag == _TC and tables:
+                    table = tables[-1]
+                    vmerge = elem.find(_VMERGE)
+                    if vmerge is None or vmerge.get(_VAL) == "restart":
+                        table.cells.append("\n".join(table.cell_parts))
+
+                elif tag == _TR and tables:
+                    table = tables[-1]
+                    row = CELL_SEPARATOR.join(cell for cell in table.cells if cell)
+                    if row and row != table.previous_row:
+                        table.rows.append(row)
+                        table.previous_row = row
+                    elem.clear()
+
+                elif tag == _TBL and tables:
+                    table = tables.pop()
+                    if tables:
+                        # Nested table: its rows belong to the enclosing cell
+                        tables[-1].cell_parts.extend(table.rows)
+                    else:
+                        lines.extend(table.rows)
+                    elem.clear()
+
+    return "\n".join(lines).strip()
+
+
+def extract_docx_text_python_docx(source: DocxSource) -> str:
+    """Fallback extraction through the python-docx object model"""
+    from docx import Document as DocxDocument
+
+    doc = DocxDocument(io.BytesIO(source) if isinstance(source, bytes) else source)
+    lines = [paragraph.text for paragraph in doc.paragraphs]
+
+    for table in doc.tables:
+        for row in table.rows:
+            # row.cells repeats merged cells once per grid column they span
+            seen = set()
+            cells = []
+            for cell in row.cells:
+                if id(cell._tc) not in seen:
+                    seen.add(id(cell._tc))
+                    cells.append(cell.text)
+            lines.append(CELL_SEPARATOR.join(cell for cell in cells if cell))
+
+    return "\n".join(lines).strip()
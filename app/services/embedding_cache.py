@@ -0,0 +1,184 @@
+"""
+Two-tier cache of text embeddings keyed by model, task type and text
+"""
+
+import os
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+from pathlib import Path
+import numpy as np
+from loguru import logger
+
+KEY_BYTES = 16  # Truncated SHA-256 digest per cached vector
+
+
+class _VectorFile:
+    """
+    Append-only float32 vectors of one dimension, with a parallel file of keys
+
+    Row i of <name>.f32 holds the vector whose key is record i of <name>.keys.
+    Vectors are written before their key, and trailing partial or unkeyed
+    rows are truncated on open, so an interrupted write is simply forgotten.
+    """
+
+    def __init__(self, directory: Path, dimension: int):
+        self.dimension = dimension
+        self.row_bytes = dimension * 4
+        self.vectors_path = directory / f"embeddings_{dimension}.f32"
+        self.keys_path = directory / f"embeddings_{dimension}.keys"
+        self.rows: Dict[bytes, int] = {}
+
+        for path in (self.vectors_path, self.keys_path):
+            path.touch(exist_ok=True)
+
+        with open(self.keys_path, "rb") as f:
+            keys = f.read()
+        count = min(len(keys) // KEY_BYTES, os.path.getsize(self.vectors_path) // self.row_bytes)
+        os.truncate(self.keys_path, count * KEY_BYTES)
+        os.truncate(self.vectors_path, count * self.row_bytes)
+        for row in range(count):
+            self.rows[keys[row * KEY_BYTES:(row + 1) * KEY_BYTES]] = row
+
+    def read_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        """Read the vectors stored for keys (None where missing), opening the file once"""
+        rows = [self.rows.get(key) for key in keys]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        found = sorted((index for index, row in enumerate(rows) if row is not None), key=rows.__getitem__)
+        if not found:
+            return results
+
+        # In row order, so the reads move forward through the file
+        with open(self.vectors_path, "rb") as f:
+            for index in found:
+                f.seek(rows[index] * self.row_bytes)
+                results[index] = np.frombuffer(f.read(self.row_bytes), dtype=np.float32)
+        return results
+
+    def append(self, items: List[Tuple[bytes, np.ndarray]]):
+        """Append vectors for keys not stored yet"""
+        items = [(key, vector) for key, vector in items if key not in self.rows]
+        if not items:
+            return
+
+        with open(self.vectors_path, "ab") as f:
+            first_row = f.tell() // self.row_bytes
+            f.write(np.stack([vector for _, vector in items]).astype(np.float32).tobytes())
+        with open(self.keys_path, "ab") as f:
+            f.write(b"".join(key for key, _ in items))
+
+        for offset, (key, _) in enumerate(items):
+            self.rows[key] = first_row + offset
+
+
+class EmbeddingCache:
+    """
+    Embedding cache with an in-memory LRU tier in front of a float32 disk store
+
+    Keys are digests of (model name, task type, text), so vectors from
+    different models or task types never mix. The memory tier holds the most
+    recently used vectors; everything ever computed stays on disk in compact
+    append-only files, one pair per embedding dimension.
+
+    Disk reads and writes run in worker threads under their own lock; the
+    event loop only takes the memory tier's lock, which is never held
+    across I/O.
+    """
+
+    def __init__(self, path: Path, memory_entries: int):
+        self.path = Path(path)
+        self.memory_entries = memory_entries
+        self.memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.files: Dict[int, _VectorFile] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Memory tier
+        self._disk_lock = threading.Lock()  # Vector files; only taken in worker threads
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        for keys_file in self.path.glob("embeddings_*.keys"):
+            dimension = int(keys_file.stem.split("_")[1])
+            self.files[dimension] = _VectorFile(self.path, dimension)
+        logger.info(f"Loaded embedding cache with {sum(len(f.rows) for f in self.files.values())} vectors")
+
+    @staticmethod
+    def key_for(model: str, task_type: str, text: str) -> bytes:
+        """Build the cache key for a text embedded by a model for a task type"""
+        return hashlib.sha256(f"{model}\0{task_type}\0{text}".encode("utf-8")).digest()[:KEY_BYTES]
+
+    async def get_many(self, model: str, task_type: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up vectors for texts, returning None for each miss"""
+        keys = [self.key_for(model, task_type, text) for text in texts]
+        with self._lock:
+            results = [self._memory_get(key) for key in keys]
+
+        missing = [index for index, vector in enumerate(results) if vector is None]
+        if missing and self.files:
+            found = await asyncio.to_thread(self._disk_get, [keys[index] for index in missing])
+            for index, vector in zip(missing, found):
+                results[index] = vector
+
+        hits = sum(vector is not None for vector in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    async def put_many(self, model: str, task_type: str, texts: List[str], vectors: List[np.ndarray]):
+        """Store freshly computed vectors in both tiers"""
+        items = [
+            (self.key_for(model, task_type, text), np.asarray(vector, dtype=np.float32))
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            for key, vector in items:
+                self._memory_put(key, vector)
+
+        try:
+            await asyncio.to_thread(self._disk_put, items)
+        except Exception as e:
+            logger.warning(f"Failed to persist {len(items)} embeddings to cache: {str(e)}")
+
+    def _memory_get(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.memory.move_to_end(key)
+        return vector
+
+    def _memory_put(self, key: bytes, vector: np.ndarray):
+        if self.memory_entries <= 0:
+            return
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _disk_get(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        """Read vectors from whichever dimension file holds each key, promoting hits to memory"""
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        with self._disk_lock:
+            for vector_file in self.files.values():
+                missing = [index for index, vector in enumerate(results) if vector is None]
+                if not missing:
+                    break
+                for index, vector in zip(missing, vector_file.read_many([keys[index] for index in missing])):
+                    results[index] = vector
+
+        with self._lock:
+            for key, vector in zip(keys, results):
+                if vector is not None:
+                    self._memory_put(key, vector)
+        return results
+
+    def _disk_put(self, items: List[Tuple[bytes, np.ndarray]]):
+        """Append vectors to the file for their dimension"""
+        by_dimension: Dict[int, List[Tuple[bytes, np.ndarray]]] = {}
+        for key, vector in items:
+            by_dimension.setdefault(vector.shape[-1], []).append((key, vector))
+
+        with self._disk_lock:
+            for dimension, dimension_items in by_dimension.items():
+                if dimension not in self.files:
+                    self.files[dimension] = _VectorFile(self.path, dimension)
+                self.files[dimension].append(dimension_items)
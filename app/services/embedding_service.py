@@ -1,19 +1,25 @@
 """
 Embedding service for generating vector representations of text using Google Gemini
 or a local SentenceTransformer model.
+
+The Gemini SDK and torch/sentence-transformers are imported only by the backend
+that is actually used, and only when the service is built or initialized.
 """
 
-import os
 import asyncio
-from typing import List, Optional
+import importlib
+from typing import List, Optional, Tuple, TYPE_CHECKING
 import numpy as np
-import google.generativeai as genai
-from sentence_transformers import SentenceTransformer
 from loguru import logger
-from google.api_core.exceptions import InvalidArgument, GoogleAPICallError
 
 from app.core.config import settings
-from app.core.exceptions import LLMError
+from app.core.exceptions import LLMError, CircuitOpenError
+from app.services.embedding_cache import EmbeddingCache
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+    from app.services.gemini_embeddings import GeminiEmbeddingClient
+    from app.services.local_embeddings import LocalEmbeddingWorker
 
 # --- BEST PRACTICE: Define constants for model names ---
 # This prevents typos and makes the code easier to update.
@@ -24,25 +30,48 @@ LOCAL_EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"  # Fast and high-quality fallbac
 class EmbeddingService:
     """Service for generating text embeddings."""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[EmbeddingCache] = None, model: Optional[str] = None):
         """
         Initializes the service. The key change is validating the API key here.
+        
+        Args:
+            cache: Embedding cache to share; one is created from settings when omitted
+            model: Pin the service to a model name as reported by model_name, e.g. to
+                keep serving an index built with a previous model. Pinned services
+                never fail over to another model.
         """
-        self.local_model: Optional[SentenceTransformer] = None
+        self.local_model: Optional["SentenceTransformer"] = None
+        self.local_worker: Optional["LocalEmbeddingWorker"] = None
+        self.local_backend = settings.LOCAL_EMBEDDING_BACKEND.strip().lower()
+        self.pinned_model = model
+        self._local_model_lock = asyncio.Lock()
+        self.cache = cache
+        if self.cache is None and settings.EMBEDDING_CACHE_ENABLED:
+            self.cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MEMORY_ENTRIES)
         self.use_gemini = False  # Default to False
+        self.gemini_client: Optional["GeminiEmbeddingClient"] = None
         self.dimension = settings.EMBEDDING_DIMENSION
 
         # --- FIX #1: ROBUST API KEY VALIDATION ---
         # This is the most critical fix to prevent the 'API_KEY_INVALID' error.
         api_key = settings.GEMINI_API_KEY
-        if api_key and api_key.strip() and len(api_key) > 10:  # Basic check for a valid-looking key
+        if model is not None and model != GEMINI_EMBEDDING_MODEL_NAME:
+            # Pinned to a local model; the backend is encoded in the name
+            self.local_backend = self._local_backend_for(model)
+        elif api_key and api_key.strip() and len(api_key) > 10:  # Basic check for a valid-looking key
             logger.info("GEMINI_API_KEY found. Configuring the Gemini client.")
             self.use_gemini = True
             try:
+                import google.generativeai as genai
+                from app.services.gemini_embeddings import GeminiEmbeddingClient
+                
                 genai.configure(api_key=api_key)
+                self.gemini_client = GeminiEmbeddingClient(GEMINI_EMBEDDING_MODEL_NAME)
             except Exception as e:
                 # Catch potential configuration errors early.
                 raise LLMError(f"Failed to configure Gemini client even though a key was provided: {e}")
+        elif model is not None:
+            raise LLMError(f"GEMINI_API_KEY is required for embedding model {model}")
         else:
             logger.warning("GEMINI_API_KEY is not set or is invalid. Falling back to local SentenceTransformer model.")
     
@@ -51,11 +80,20 @@ class EmbeddingService:
         try:
             if self.use_gemini:
                 logger.info(f"Initializing Gemini embedding service with model: {GEMINI_EMBEDDING_MODEL_NAME}")
-                await self._test_gemini_connection()
-                # The Gemini embedding-001 model has a dimension of 768
-                self.dimension = 768
-            else:
-                logger.info(f"Initializing local embedding service with model: {LOCAL_EMBEDDING_MODEL_NAME}")
+                try:
+                    await self._test_gemini_connection()
+                    # The Gemini embedding-001 model has a dimension of 768
+                    self.dimension = 768
+                except LLMError:
+                    if self.pinned_model:
+                        raise
+                    # Fail over once, before anything is embedded, so every stored
+                    # vector comes from the same model
+                    logger.warning("Gemini embeddings unavailable, using the local model for this process.")
+                    self.use_gemini = False
+            
+            if not self.use_gemini:
+                logger.info(f"Initializing local embedding service with model: {self.local_model_name}")
                 await self._initialize_local_model()
                 
             logger.success(f"Embedding service initialized successfully. Dimension: {self.dimension}")
@@ -64,80 +102,98 @@ class EmbeddingService:
             # The exception from _test_gemini_connection will be caught here.
             raise LLMError(f"Failed to initialize embedding service: {e}")
     
-    async def generate_embeddings(self, texts: List[str]) -> List[np.ndarray]:
-        """Generate embeddings for a list of texts."""
+    async def generate_embeddings(self, texts: List[str], task_type: str = "retrieval_document") -> List[np.ndarray]:
+        """
+        Generate embeddings for a list of texts.
+        
+        Vectors already in the embedding cache for this model and task type are
+        reused; only the distinct texts that miss are sent to the model.
+        """
         if not texts:
             return []
         
         try:
-            if self.use_gemini:
-                return await self._generate_gemini_embeddings(texts)
-            else:
-                # Ensure local model is loaded if not already
-                if not self.local_model:
-                    await self._initialize_local_model()
-                return await self._generate_local_embeddings(texts)
+            if self.cache is None:
+                embeddings, _ = await self._embed(texts, task_type)
+                return embeddings
+            
+            embeddings = await self.cache.get_many(self.model_name, task_type, texts)
+            missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+            if not missing:
+                return embeddings
+            
+            computed, model = await self._embed(missing, task_type)
+            # Cache under the model that actually produced the vectors
+            await self.cache.put_many(model, task_type, missing, computed)
+            
+            by_text = dict(zip(missing, computed))
+            logger.debug(f"Embedding cache: {len(texts) - len(missing)} of {len(texts)} texts reused")
+            return [embedding if embedding is not None else by_text[text] for text, embedding in zip(texts, embeddings)]
                 
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {e}")
             raise LLMError(f"Failed to generate embeddings: {e}")
-
-    async def _generate_gemini_embeddings(self, texts: List[str]) -> List[np.ndarray]:
-        """Generate embeddings using the Google Gemini API efficiently."""
+    
+    async def _embed(self, texts: List[str], task_type: str) -> Tuple[List[np.ndarray], str]:
+        """Run the active model over texts, returning the vectors and the model that produced them."""
+        if self.use_gemini:
+            return await self._generate_gemini_embeddings(texts, task_type)
         
-        # --- FIX #2: EFFICIENT BATCHING ---
-        # The `embed_content` function is designed to handle a list of texts at once.
-        # Calling it in a loop is highly inefficient. This is much faster.
-        try:
-            # The API handles batching internally up to its limit (e.g., 100).
-            # We pass the whole list directly.
-            response = await asyncio.to_thread(
-                genai.embed_content,
-                model=GEMINI_EMBEDDING_MODEL_NAME,
-                content=texts,
-                task_type="retrieval_document"
-            )
-            
-            embeddings = [np.array(embedding) for embedding in response['embedding']]
-            logger.info(f"Generated {len(embeddings)} Gemini embeddings.")
-            return embeddings
+        # Ensure local model is loaded if not already
+        if not self.local_model:
+            await self._initialize_local_model()
+        return await self._generate_local_embeddings(texts), self.local_model_name
 
-        except (InvalidArgument, GoogleAPICallError) as e:
-            logger.error(f"A Google API error occurred during Gemini embedding generation: {e}")
-            logger.warning("Falling back to local embedding model due to API error.")
-            # Ensure local model is loaded for fallback
-            if not self.local_model:
-                await self._initialize_local_model()
-            return await self._generate_local_embeddings(texts)
+    async def _generate_gemini_embeddings(self, texts: List[str], task_type: str) -> Tuple[List[np.ndarray], str]:
+        """
+        Generate embeddings using the Google Gemini API.
+        
+        Errors are raised rather than answered with the local model: its
+        vectors have a different dimension and would not match the index.
+        """
+        embeddings = await self.gemini_client.embed(texts, task_type)
+        return embeddings, GEMINI_EMBEDDING_MODEL_NAME
     
     async def _generate_local_embeddings(self, texts: List[str]) -> List[np.ndarray]:
-        """Generate embeddings using the local SentenceTransformer model."""
-        if not self.local_model:
+        """Generate embeddings using the local SentenceTransformer model, batched with concurrent callers."""
+        if not self.local_worker:
             raise LLMError("Local embedding model is not initialized.")
-            
-        embeddings = self.local_model.encode(
-            texts,
-            convert_to_numpy=True,
-            show_progress_bar=len(texts) > 10
-        )
-        return [np.array(embedding) for embedding in embeddings]
+        
+        return await self.local_worker.embed(texts)
 
     async def _initialize_local_model(self):
-        """Loads and initializes the local SentenceTransformer model."""
-        if self.local_model is None:
-            logger.info(f"Loading local model: {LOCAL_EMBEDDING_MODEL_NAME}...")
-            # Run the synchronous model loading in a separate thread
-            self.local_model = await asyncio.to_thread(SentenceTransformer, LOCAL_EMBEDDING_MODEL_NAME)
-            self.dimension = self.local_model.get_sentence_embedding_dimension()
-            logger.info("Local model loaded successfully.")
+        """Loads and initializes the local SentenceTransformer model and its inference worker."""
+        async with self._local_model_lock:
+            if self.local_model is None:
+                logger.info(f"Loading local model: {self.local_model_name}...")
+                # Importing torch takes seconds; keep it off the event loop too
+                local_embeddings = await asyncio.to_thread(importlib.import_module, "app.services.local_embeddings")
+                # Run the synchronous model loading in a separate thread
+                self.local_model = await asyncio.to_thread(
+                    local_embeddings.load_local_model,
+                    LOCAL_EMBEDDING_MODEL_NAME,
+                    backend=self.local_backend,
+                    threads=settings.LOCAL_EMBEDDING_THREADS,
+                    max_seq_length=settings.LOCAL_EMBEDDING_MAX_SEQ_LENGTH
+                )
+                self.dimension = self.local_model.get_sentence_embedding_dimension()
+                self.local_worker = local_embeddings.LocalEmbeddingWorker(
+                    self.local_model,
+                    max_batch_size=settings.LOCAL_EMBEDDING_MAX_BATCH_SIZE,
+                    max_wait_ms=settings.LOCAL_EMBEDDING_MAX_WAIT_MS
+                )
+                logger.info("Local model loaded successfully.")
 
     async def _test_gemini_connection(self):
         """Tests the Gemini API connection with a simple request."""
+        from google.api_core.exceptions import InvalidArgument, GoogleAPICallError
+        
         try:
             logger.info("Testing Gemini API connection...")
-            await self.generate_embeddings(["test connection"])
+            # Always reach the API: the failover decision depends on it
+            await self.gemini_client.embed(["test connection"], "retrieval_document")
             logger.success("✅ Gemini API connection test successful.")
-        except (InvalidArgument, GoogleAPICallError) as e:
+        except (InvalidArgument, GoogleAPICallError, CircuitOpenError) as e:
             # --- FIX #3: CLEARER ERROR MESSAGE ---
             error_message = (
                 "Gemini API connection failed. This is likely due to an invalid API key "
@@ -147,6 +203,33 @@ class EmbeddingService:
             logger.error(error_message)
             raise LLMError(error_message)
 
+    @property
+    def model_name(self) -> str:
+        """Returns the name of the model that produces this service's embeddings."""
+        return GEMINI_EMBEDDING_MODEL_NAME if self.use_gemini else self.local_model_name
+
+    @staticmethod
+    def _local_backend_for(model: str) -> str:
+        """Parse the backend out of a local model name produced by local_model_name."""
+        if model == LOCAL_EMBEDDING_MODEL_NAME:
+            return "fp32"
+        if model.startswith(f"{LOCAL_EMBEDDING_MODEL_NAME}-"):
+            return model[len(LOCAL_EMBEDDING_MODEL_NAME) + 1:]
+        raise LLMError(f"Unknown embedding model: {model}")
+
+    @property
+    def local_model_name(self) -> str:
+        """Returns the local model's name, tagged with its backend when not fp32."""
+        if self.local_backend == "fp32":
+            return LOCAL_EMBEDDING_MODEL_NAME
+        return f"{LOCAL_EMBEDDING_MODEL_NAME}-{self.local_backend}"
+
+    def close(self):
+        """Stop the local inference worker, if running."""
+        if self.local_worker is not None:
+            self.local_worker.close()
+            self.local_worker = None
+
     def get_dimension(self) -> int:
         """Returns the embedding dimension of the currently active model."""
         return self.dimension
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+FAISS index construction, selection and tuning for the vector store
+
+Vectors are L2-normalized before they are added or searched, so inner
+product is cosine similarity for every index type. Indexes smaller than
+FAISS_APPROXIMATE_THRESHOLD vectors are exact flat indexes; larger ones are
+built as the configured approximate index (IVF-Flat or HNSW), whose search
+cost grows far slower than the corpus.
+"""
+
+import math
+from typing import Optional
+import numpy as np
+import faiss
+
+from app.core.config import settings
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+MIN_POINTS_PER_LIST = 39  # Fewer k-means training points per IVF list gives poor centroids
+TRAINING_POINTS_PER_LIST = 64  # IVF training sample size, per list
+
+
+def normalized(vectors) -> np.ndarray:
+    """Copy vectors into a contiguous float32 matrix with unit-length rows"""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    faiss.normalize_L2(matrix)
+    return matrix
+
+
+def configured_index_type() -> str:
+    """The approximate index type from FAISS_INDEX_TYPE"""
+    index_type = settings.FAISS_INDEX_TYPE.strip().lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+    return index_type
+
+
+def target_index_type(count: int) -> str:
+    """Index type to use for a corpus of count vectors"""
+    index_type = configured_index_type()
+    if count < settings.FAISS_APPROXIMATE_THRESHOLD or (index_type == "ivf" and count == 0):
+        return "flat"
+    return index_type
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Classify an index as flat, ivf or hnsw"""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def ivf_list_count(count: int) -> int:
+    """Number of IVF lists for count vectors, keeping enough training points per list"""
+    nlist = settings.FAISS_IVF_NLIST or int(4 * math.sqrt(count))
+    return max(1, min(nlist, count // MIN_POINTS_PER_LIST))
+
+
+def build_index(index_type: str, dimension: int, vectors: Optional[np.ndarray] = None) -> faiss.Index:
+    """
+    Build an index of the given type holding vectors (already normalized)
+
+    IVF is trained on a random sample of the vectors. This is CPU-bound and
+    meant to run in a worker thread.
+    """
+    count = 0 if vectors is None else len(vectors)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, settings.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+    elif index_type == "ivf":
+        nlist = ivf_list_count(count)
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        sample_size = min(count, nlist * TRAINING_POINTS_PER_LIST)
+        sample = vectors[np.random.default_rng(0).choice(count, sample_size, replace=False)]
+        index.train(sample)
+    else:
+        index = faiss.IndexFlatIP(dimension)
+
+    tune(index)
+    if count:
+        index.add(vectors)
+    return index
+
+
+def tune(index: faiss.Index):
+    """Apply the configured search-time parameters (not all are persisted with the index)"""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = max(1, min(settings.FAISS_IVF_NPROBE, index.nlist))
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+
+
+def vectors_of(index: faiss.Index, start: int, end: int) -> np.ndarray:
+    """Read back the stored vectors at positions [start, end)"""
+    if end <= start:
+        return np.empty((0, index.d), dtype=np.float32)
+    if isinstance(index, faiss.IndexIVF) and index.direct_map.type == faiss.DirectMap.NoMap:
+        # IVF only reconstructs by position once it keeps a position -> list map
+        index.make_direct_map()
+    return index.reconstruct_n(start, end - start)
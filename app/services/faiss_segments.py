@@ -0,0 +1,486 @@
+"""
+Append-only segment persistence for the FAISS vector store
+"""
+
+import os
+import json
+import time
+import pickle
+import asyncio
+import itertools
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Set, Tuple, Dict, Any, Union
+from pathlib import Path
+import numpy as np
+import faiss
+from loguru import logger
+
+from app.core.config import settings
+from app.models.document import DocumentChunk
+from app.services.chunk_store import (
+    BufferedChunks,
+    ChunkSegment,
+    records_of,
+    remove_chunk_segment,
+    write_chunk_segment
+)
+from app.services.faiss_index import (
+    build_index,
+    index_type_of,
+    normalized,
+    target_index_type,
+    tune,
+    vectors_of
+)
+
+# Read flags that memory-map a saved index instead of copying it into RAM. Older
+# faiss releases (e.g. 1.7.4) have no IO_FLAG_MMAP_IFC; flat and HNSW indexes are
+# then read into memory, since IO_FLAG_MMAP only maps IVF inverted lists.
+_MMAP_IFC = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+MMAP_FLAGS = {
+    "flat": _MMAP_IFC,
+    "hnsw": _MMAP_IFC,
+    "ivf": faiss.IO_FLAG_MMAP,
+}
+
+
+@dataclass
+class _Segment:
+    """An immutable, persisted run of consecutive vectors and their chunks"""
+    name: str
+    index_type: str
+    count: int
+    index: Optional[faiss.Index]
+    chunks: Optional[Union[ChunkSegment, BufferedChunks]] = None
+    pending: bool = False  # Frozen live buffer whose files flush() has not finished writing
+
+
+class SegmentedIndex:
+    """
+    Vectors and chunks stored as immutable segments plus an in-memory live buffer
+
+    New vectors go to a flat live buffer; flush() writes it out as a new
+    segment, so saving costs O(new data) instead of O(corpus). The buffer is
+    frozen and written in a worker thread; until the files are done it serves
+    searches as a pending segment, and new vectors go to a fresh buffer. Segments are
+    opened memory-mapped, which makes startup cheap and lets processes share
+    index pages through the OS page cache. Searches query every segment and
+    merge the top hits. A background task keeps the segment count at or below
+    FAISS_MAX_SEGMENTS by merging the smallest adjacent pair; merged segments
+    use the index type suited to their size (see faiss_index).
+
+    Each segment's chunks are kept in a columnar, memory-mapped chunk store
+    (see chunk_store); only the live buffer holds DocumentChunk models, and
+    chunks_at() builds them for the positions asked for.
+
+    Segments are always merged with their neighbours, so a vector's position
+    (its offset across segments and the live buffer) never changes.
+    """
+
+    def __init__(self, path: Path, dimension: int):
+        self.path = Path(path)
+        self.dimension = dimension
+        self.manifest_path = self.path / "segments.json"
+        self.segments: List[_Segment] = []
+        self.live = faiss.IndexFlatIP(dimension)
+        self.live_chunks: List[DocumentChunk] = []
+        self.live_positions: Dict[str, int] = {}
+        self.next_id = 1
+        self.merge_task: Optional[asyncio.Task] = None
+        self.merge_build: Optional[asyncio.Future] = None  # Worker thread writing a merged segment
+        self.flush_tasks: Set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def ntotal(self) -> int:
+        """Number of stored vectors"""
+        return self._live_start + self.live.ntotal
+
+    def load(self) -> bool:
+        """Open the persisted segments, memory-mapping their indexes; False if there are none"""
+        if not self.manifest_path.exists():
+            if not self._import_single_file_layout():
+                return False
+
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        self.next_id = manifest['next_id']
+        for entry in manifest['segments']:
+            name = entry['name']
+            index = faiss.read_index(str(self._index_file(name)), MMAP_FLAGS[entry['index_type']])
+            tune(index)
+            if self._pickled_chunks_file(name).exists():
+                self._convert_pickled_chunks(name)
+            chunks = ChunkSegment(self._chunks_prefix(name))
+            if index.ntotal != chunks.count:
+                raise ValueError(f"Segment {name} has {index.ntotal} vectors but {chunks.count} chunks")
+
+            self.segments.append(_Segment(name, entry['index_type'], chunks.count, index, chunks))
+
+        self._remove_unreferenced_files()
+        self._schedule_merge()
+        return True
+
+    def add(self, vectors: np.ndarray, chunks: List[DocumentChunk]):
+        """Append normalized vectors and their chunks to the live buffer"""
+        for chunk in chunks:
+            self.live_positions[chunk.id] = len(self.live_chunks)
+            self.live_chunks.append(chunk)
+        self.live.add(vectors)
+
+    def position_of(self, chunk_id: str) -> Optional[int]:
+        """Position of the stored chunk with this id, or None"""
+        row = self.live_positions.get(chunk_id)
+        if row is not None:
+            return self._live_start + row
+
+        start = 0
+        for segment in self.segments:
+            row = segment.chunks.find(chunk_id)
+            if row is not None:
+                return start + row
+            start += segment.count
+        return None
+
+    def chunks_at(self, positions: Iterable[int]) -> List[DocumentChunk]:
+        """Build DocumentChunk models for the chunks at these positions, in order"""
+        chunks = []
+        for position in positions:
+            segment, row = self._locate(position)
+            if segment is not None:
+                chunks.append(segment.chunks.chunk(row))
+            else:
+                # Copied so callers cannot change the buffered chunk
+                chunk = self.live_chunks[row]
+                chunks.append(chunk.model_copy(update={'metadata': dict(chunk.metadata), 'embedding': None}))
+        return chunks
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Search every segment and the live buffer, returning the top k (scores, positions) per query"""
+        all_scores, all_positions = [], []
+        start = 0
+        for index in [segment.index for segment in self.segments] + [self.live]:
+            if index.ntotal:
+                scores, ids = index.search(queries, min(k, index.ntotal))
+                all_scores.append(scores)
+                all_positions.append(np.where(ids >= 0, ids + start, -1))
+            start += index.ntotal
+
+        scores = np.hstack(all_scores)
+        positions = np.hstack(all_positions)
+        top = np.argsort(-scores, axis=1)[:, :k]
+        return np.take_along_axis(scores, top, axis=1), np.take_along_axis(positions, top, axis=1)
+
+    def update_metadata(self, position: int, metadata: Dict[str, Any]):
+        """Merge metadata into a stored chunk; persisted by the next flush"""
+        segment, row = self._locate(position)
+        if segment is not None:
+            segment.chunks.update(row, metadata)
+        else:
+            self.live_chunks[row].metadata.update(metadata)
+
+    async def flush(self):
+        """Write the live buffer as a new segment and save changed chunk metadata"""
+        # Shielded: a cancelled caller must not leave a segment half written
+        task = asyncio.create_task(self._flush())
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+        await asyncio.shield(task)
+
+    async def _flush(self):
+        async with self._flush_lock:
+            updates = [
+                (segment.chunks, segment.chunks.take_updates())
+                for segment in self.segments if not segment.pending and segment.chunks.dirty
+            ]
+            if self.live.ntotal:
+                self._freeze_live()
+            # A segment left pending by a failed flush is retried, keeping pending ones at the end
+            pending = [segment for segment in self.segments if segment.pending]
+
+            try:
+                await asyncio.to_thread(self._write_flush, updates, pending)
+            except Exception:
+                for chunks, _ in updates:
+                    chunks.dirty = True
+                raise
+
+            for segment in pending:
+                self._open_written(segment)
+            self._write_manifest()
+            self._schedule_merge()
+
+    def _freeze_live(self):
+        """Turn the live buffer into a pending segment and start a fresh buffer"""
+        chunks = BufferedChunks(self.live_chunks, self.live_positions)
+        self.segments.append(_Segment(self._new_segment_name(), "flat", chunks.count, self.live, chunks, pending=True))
+        self._reset_live()
+
+    def _write_flush(
+        self,
+        updates: List[Tuple[ChunkSegment, Dict[str, Dict[str, Any]]]],
+        pending: List[_Segment]
+    ):
+        """Write metadata updates and the pending segments' files (runs in a worker thread)"""
+        for chunks, snapshot in updates:
+            chunks.write_updates(snapshot)
+
+        for segment in pending:
+            # Frozen: nothing adds to the index or changes the base records any more
+            faiss.write_index(segment.index, str(self._index_file(segment.name)))
+            write_chunk_segment(self._chunks_prefix(segment.name), segment.chunks.base_records)
+
+    def _open_written(self, segment: _Segment):
+        """Swap a pending segment's in-memory buffer for its memory-mapped files"""
+        index = faiss.read_index(str(self._index_file(segment.name)), MMAP_FLAGS["flat"])
+        chunks = ChunkSegment(self._chunks_prefix(segment.name))
+        # Metadata merged in while it was pending is saved by the next flush
+        for row, metadata in segment.chunks.updates.items():
+            chunks.update(row, metadata)
+        segment.index, segment.chunks, segment.pending = index, chunks, False
+
+    async def clear(self):
+        """Remove every segment and the live buffer"""
+        await self.close()
+        old_segments = list(self.segments)
+        self.segments.clear()
+        self._reset_live()
+        self._write_manifest()
+        self._remove_segment_files(old_segments)
+
+    async def close(self):
+        """Wait for flushes and stop background merging; unmerged segments stay valid on disk"""
+        # First, as a finished flush may schedule another merge
+        if self.flush_tasks:
+            await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+
+        if self.merge_task is not None and not self.merge_task.done():
+            self.merge_task.cancel()
+            try:
+                await self.merge_task
+            except asyncio.CancelledError:
+                pass
+        self.merge_task = None
+
+        # Cancelling the merge does not stop its worker thread, which still reads
+        # the segments; they must stay mapped until it is done
+        if self.merge_build is not None:
+            await asyncio.gather(self.merge_build, return_exceptions=True)
+            self.merge_build = None
+
+    def describe(self) -> Dict[str, Any]:
+        """Segment counts by index type, and the live buffer size"""
+        types: Dict[str, int] = {}
+        for segment in self.segments:
+            types[segment.index_type] = types.get(segment.index_type, 0) + 1
+        return {"segments": len(self.segments), "segment_types": types, "live_vectors": self.live.ntotal}
+
+    def _schedule_merge(self):
+        """Start the background merge task if segments need merging"""
+        if (self.merge_task is None or self.merge_task.done()) and self._plan_merge():
+            self.merge_task = asyncio.create_task(self._merge_segments())
+
+    def _plan_merge(self) -> Optional[List[_Segment]]:
+        """Pick the next run of adjacent segments to merge, if any"""
+        # Pending segments are always the last ones and are not merged until written
+        segments = [segment for segment in self.segments if not segment.pending]
+
+        # A segment whose size calls for another index type is rebuilt on its own
+        for segment in segments:
+            if segment.index_type != target_index_type(segment.count):
+                return [segment]
+
+        if len(segments) <= max(1, settings.FAISS_MAX_SEGMENTS):
+            return None
+
+        # Merging the smallest adjacent pair keeps segment sizes roughly tiered
+        i = min(range(len(segments) - 1), key=lambda i: segments[i].count + segments[i + 1].count)
+        return segments[i:i + 2]
+
+    async def _merge_segments(self):
+        """Merge segments until none need merging"""
+        try:
+            while run := self._plan_merge():
+                await self._merge(run)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"FAISS segment merge failed: {str(e)}")
+
+    async def _merge(self, run: List[_Segment]):
+        """Replace a run of adjacent segments with one segment built in a worker thread"""
+        count = sum(segment.count for segment in run)
+        index_type = target_index_type(count)
+        name = self._new_segment_name()
+        started = time.perf_counter()
+
+        # Metadata updates as of now are folded into the merged chunks
+        snapshots = [
+            {row: dict(metadata) for row, metadata in segment.chunks.updates.items()} for segment in run
+        ]
+        # Kept so close() can wait for the thread, which cancelling this task does not stop
+        self.merge_build = asyncio.ensure_future(
+            asyncio.to_thread(self._build_merged, run, snapshots, name, index_type)
+        )
+        await asyncio.shield(self.merge_build)
+        self.merge_build = None
+
+        positions = [i for i, segment in enumerate(self.segments) if any(segment is r for r in run)]
+        if len(positions) != len(run):
+            # Cleared while merging
+            self._remove_segment_files([_Segment(name, index_type, count, None)])
+            return
+
+        index = faiss.read_index(str(self._index_file(name)), MMAP_FLAGS[index_type])
+        tune(index)
+        chunks = ChunkSegment(self._chunks_prefix(name))
+        # Metadata updated during the merge is carried over as updates of the merged segment
+        start = 0
+        for segment, snapshot in zip(run, snapshots):
+            for row, metadata in segment.chunks.updates.items():
+                if snapshot.get(row) != metadata:
+                    chunks.update(start + row, metadata)
+            start += segment.count
+
+        merged = _Segment(name, index_type, count, index, chunks)
+        self.segments[positions[0]:positions[-1] + 1] = [merged]
+        self._write_manifest()
+        self._remove_segment_files(run)
+
+        logger.info(
+            f"Merged {len(run)} FAISS segment(s) into {name} ({index_type}, {count} vectors) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def _build_merged(
+        self,
+        run: List[_Segment],
+        snapshots: List[Dict[int, Dict[str, Any]]],
+        name: str,
+        index_type: str
+    ):
+        """Build and write the merged segment's index and chunks (runs in a worker thread)"""
+        vectors = np.vstack([vectors_of(segment.index, 0, segment.count) for segment in run])
+        index = build_index(index_type, self.dimension, vectors)
+        faiss.write_index(index, str(self._index_file(name)))
+
+        write_chunk_segment(self._chunks_prefix(name), itertools.chain.from_iterable(
+            segment.chunks.records(snapshot) for segment, snapshot in zip(run, snapshots)
+        ))
+
+    def _import_single_file_layout(self) -> bool:
+        """Turn an index saved as one faiss.index + chunks.pkl into the first segment"""
+        index_file, chunks_file = self.path / "faiss.index", self.path / "chunks.pkl"
+        meta_file = self.path / "index.json"
+        if not index_file.exists() or not chunks_file.exists():
+            return False
+
+        meta = {}
+        if meta_file.exists():
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+        name = self._new_segment_name()
+        with open(chunks_file, 'rb') as f:
+            write_chunk_segment(self._chunks_prefix(name), records_of(pickle.load(f)))
+
+        index = faiss.read_index(str(index_file))
+        if meta.get('normalized'):
+            os.replace(index_file, self._index_file(name))
+        else:
+            # Saved before vectors were normalized
+            vectors = normalized(vectors_of(index, 0, index.ntotal))
+            index = faiss.IndexFlatIP(self.dimension)
+            index.add(vectors)
+            faiss.write_index(index, str(self._index_file(name)))
+            index_file.unlink()
+        chunks_file.unlink()
+        if meta_file.exists():
+            meta_file.unlink()
+
+        self._write_manifest([_Segment(name, index_type_of(index), index.ntotal, None)])
+        logger.info(f"Converted single-file FAISS index with {index.ntotal} vectors into segment {name}")
+        return True
+
+    def _convert_pickled_chunks(self, name: str):
+        """Rewrite a segment's pickled chunk list in the columnar chunk store"""
+        with open(self._pickled_chunks_file(name), 'rb') as f:
+            count = write_chunk_segment(self._chunks_prefix(name), records_of(pickle.load(f)))
+        self._pickled_chunks_file(name).unlink()
+        logger.info(f"Converted {count} pickled chunks of FAISS segment {name} to the columnar chunk store")
+
+    def _reset_live(self):
+        self.live = faiss.IndexFlatIP(self.dimension)
+        self.live_chunks = []
+        self.live_positions = {}
+
+    @property
+    def _live_start(self) -> int:
+        """Position of the first live buffer vector"""
+        return sum(segment.count for segment in self.segments)
+
+    def _locate(self, position: int) -> Tuple[Optional[_Segment], int]:
+        """The segment holding a position (None for the live buffer) and the row within it"""
+        start = 0
+        for segment in self.segments:
+            if position < start + segment.count:
+                return segment, position - start
+            start += segment.count
+        return None, position - start
+
+    def _write_manifest(self, segments: Optional[List[_Segment]] = None):
+        """Record the written segments; the previous manifest stays intact until the rename"""
+        if segments is None:
+            segments = [segment for segment in self.segments if not segment.pending]
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "next_id": self.next_id,
+                "segments": [
+                    {"name": segment.name, "index_type": segment.index_type, "count": segment.count}
+                    for segment in segments
+                ]
+            }, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _remove_segment_files(self, segments: List[_Segment]):
+        """Delete the files of segments no longer in the manifest"""
+        for segment in segments:
+            # Unmap before deleting
+            segment.index = None
+            if segment.chunks is not None:
+                segment.chunks.close()
+                segment.chunks = None
+
+            for path in (self._index_file(segment.name), self._pickled_chunks_file(segment.name)):
+                try:
+                    path.unlink(missing_ok=True)
+                except OSError as e:
+                    # Still mapped elsewhere (e.g. on Windows); removed on the next load
+                    logger.debug(f"Could not remove {path}: {str(e)}")
+            remove_chunk_segment(self._chunks_prefix(segment.name))
+
+    def _remove_unreferenced_files(self):
+        """Delete segment and temporary files left behind by an interrupted merge or flush"""
+        live_names = {segment.name for segment in self.segments}
+        for path in self.path.glob("seg-*"):
+            if path.name.split(".")[0] not in live_names or path.suffix == ".tmp":
+                path.unlink(missing_ok=True)
+
+    def _new_segment_name(self) -> str:
+        name = f"seg-{self.next_id:06d}"
+        self.next_id += 1
+        return name
+
+    def _index_file(self, name: str) -> Path:
+        return self.path / f"{name}.index"
+
+    def _chunks_prefix(self, name: str) -> Path:
+        return self.path / name
+
+    def _pickled_chunks_file(self, name: str) -> Path:
+        """Chunk file of segments written before the columnar chunk store"""
+        return self.path / f"{name}.chunks.pkl"
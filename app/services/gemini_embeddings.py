@@ -0,0 +1,99 @@
+"""
+Batched, rate-limited client for the Gemini embedding API
+"""
+
+import asyncio
+from typing import List
+import numpy as np
+import google.generativeai as genai
+from google.api_core.exceptions import (
+    GoogleAPICallError,
+    InvalidArgument,
+    ResourceExhausted,
+    TooManyRequests,
+    ServiceUnavailable,
+    DeadlineExceeded,
+    InternalServerError
+)
+from loguru import logger
+
+from app.core.config import settings
+from app.utils.resilience import TokenBucket, CircuitBreaker, backoff_delay
+
+# Transient errors worth retrying; anything else fails the batch immediately
+RETRYABLE_ERRORS = (ResourceExhausted, TooManyRequests, ServiceUnavailable, DeadlineExceeded, InternalServerError)
+
+
+class GeminiEmbeddingClient:
+    """
+    Embeds texts with Gemini in API-sized batches
+
+    Each call is split into GEMINI_EMBEDDING_BATCH_SIZE batches that run
+    concurrently, sharing a request semaphore and a token-bucket rate limit
+    across every caller of this client. Transient errors are retried with
+    jittered exponential backoff; consecutive failures open a circuit breaker
+    so callers fail fast instead of queueing against a dead API.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.batch_size = max(1, settings.GEMINI_EMBEDDING_BATCH_SIZE)
+        self.max_retries = settings.GEMINI_EMBEDDING_MAX_RETRIES
+        self.semaphore = asyncio.Semaphore(settings.GEMINI_EMBEDDING_CONCURRENCY)
+        self.rate_limiter = TokenBucket(
+            rate=settings.GEMINI_EMBEDDING_REQUESTS_PER_MINUTE / 60.0,
+            capacity=settings.GEMINI_EMBEDDING_CONCURRENCY
+        )
+        self.breaker = CircuitBreaker(
+            "Gemini embeddings",
+            failure_threshold=settings.GEMINI_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=settings.GEMINI_CIRCUIT_RESET_SECONDS
+        )
+
+    async def embed(self, texts: List[str], task_type: str) -> List[np.ndarray]:
+        """Embed texts, returning one vector per text in order"""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(self._embed_batch(batch, task_type)) for batch in batches]
+        except ExceptionGroup as e:
+            # Surface the original failure rather than the group wrapper
+            raise e.exceptions[0]
+
+        embeddings = [embedding for task in tasks for embedding in task.result()]
+        logger.info(f"Generated {len(embeddings)} Gemini embeddings in {len(batches)} requests.")
+        return embeddings
+
+    async def _embed_batch(self, texts: List[str], task_type: str) -> List[np.ndarray]:
+        """Embed one API-sized batch, retrying transient failures"""
+        for attempt in range(self.max_retries + 1):
+            self.breaker.check()
+
+            try:
+                async with self.semaphore:
+                    await self.rate_limiter.acquire()
+                    response = await asyncio.to_thread(
+                        genai.embed_content,
+                        model=self.model,
+                        content=texts,
+                        task_type=task_type
+                    )
+            except InvalidArgument:
+                # A bad request says nothing about the API's health
+                self.breaker.release()
+                raise
+            except RETRYABLE_ERRORS as e:
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, settings.GEMINI_EMBEDDING_BACKOFF_SECONDS, cap=30.0)
+                logger.warning(f"Gemini embedding batch failed ({e}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except GoogleAPICallError:
+                self.breaker.record_failure()
+                raise
+
+            self.breaker.record_success()
+            return list(np.array(response['embedding'], dtype=np.float32))
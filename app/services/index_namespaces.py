@@ -0,0 +1,53 @@
+"""
+Model-versioned index namespaces shared by the vector store implementations
+"""
+
+import os
+import re
+import json
+import time
+from typing import Dict, Any, Optional
+from pathlib import Path
+from loguru import logger
+
+
+def namespace_for(model_name: str) -> str:
+    """Filesystem- and collection-safe namespace name for an embedding model"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model_name).strip("._-") or "default"
+
+
+class NamespacePointer:
+    """
+    Persisted record of the namespace that serves queries
+
+    A vector store keeps one namespace per embedding model. The pointer names
+    the active one together with the model and dimension that produced it,
+    and is replaced atomically when a re-embedding migration completes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Read the active namespace record, or None if none has been written"""
+        if not self.path.exists():
+            return None
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to read active namespace from {self.path}: {str(e)}")
+            return None
+
+    def write(self, namespace: str, model: str, dimension: int):
+        """Point at a namespace; the previous record stays intact until the rename"""
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "namespace": namespace,
+                "model": model,
+                "dimension": dimension,
+                "updated_at": time.time()
+            }, f)
+        os.replace(tmp_path, self.path)
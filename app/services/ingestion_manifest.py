@@ -0,0 +1,117 @@
+"""
+Content-addressed ingestion manifest for skipping re-processing of known documents
+"""
+
+import os
+import json
+import time
+import hashlib
+import asyncio
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+from loguru import logger
+
+from app.core.config import settings
+from app.services.chunking import CHUNKER_VERSION
+
+
+class IngestionManifest:
+    """
+    Persistent map from document content hash to the chunk IDs already stored
+    in the vector store.
+
+    Entries are keyed by the SHA-256 of the document bytes combined with the
+    chunking and embedding configuration, so changing either invalidates them.
+    """
+
+    def __init__(self, path: Path, embedding_model: str):
+        self.path = Path(path)
+        self.embedding_model = embedding_model
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._load()
+
+    @property
+    def config_fingerprint(self) -> str:
+        """Fingerprint of the settings that determine chunk boundaries and vectors"""
+        return (
+            f"chunker=v{CHUNKER_VERSION}:chunk={settings.CHUNK_SIZE_TOKENS}:"
+            f"overlap={settings.CHUNK_OVERLAP_TOKENS}:model={self.embedding_model}"
+        )
+
+    def key_for(self, content_hash: str) -> str:
+        """Build the manifest key for a document content hash"""
+        return hashlib.sha256(f"{content_hash}|{self.config_fingerprint}".encode("utf-8")).hexdigest()
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the manifest entry for a document, if it has been ingested"""
+        return self.entries.get(self.key_for(content_hash))
+
+    def contains(self, content_hash: str) -> bool:
+        """Check whether a document has already been ingested"""
+        return self.key_for(content_hash) in self.entries
+
+    async def record(self, content_hash: str, chunk_ids: List[str], metadata: Dict[str, Any]):
+        """Record the chunk IDs stored for a document and persist the manifest"""
+        async with self._lock:
+            self.entries[self.key_for(content_hash)] = {
+                "content_hash": content_hash,
+                "chunk_ids": chunk_ids,
+                "filename": metadata.get("filename"),
+                "format": metadata.get("format"),
+                "size_bytes": metadata.get("size_bytes"),
+                "created_at": time.time()
+            }
+            await asyncio.to_thread(self._save)
+
+    def merge(self, other: "IngestionManifest"):
+        """
+        Copy another manifest's current documents into this one, in memory
+        
+        Entries are re-keyed for this manifest's configuration, so documents
+        carried over by a re-embedding migration resolve under the new model.
+        Call save() to persist.
+        """
+        for key, entry in other.entries.items():
+            if key == other.key_for(entry["content_hash"]):
+                self.entries[self.key_for(entry["content_hash"])] = dict(entry)
+
+    async def save(self):
+        """Persist the manifest"""
+        async with self._lock:
+            await asyncio.to_thread(self._save)
+
+    async def clear(self):
+        """Remove all entries"""
+        async with self._lock:
+            self.entries = {}
+            await asyncio.to_thread(self._save)
+
+    def _load(self):
+        """Load the manifest from disk"""
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+            logger.info(f"Loaded ingestion manifest with {len(self.entries)} documents")
+        except Exception as e:
+            logger.warning(f"Failed to load ingestion manifest, starting empty: {str(e)}")
+            self.entries = {}
+
+    def _save(self):
+        """Write the manifest atomically so a crash never leaves it truncated"""
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
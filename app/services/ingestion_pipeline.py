@@ -0,0 +1,93 @@
+"""
+Streaming extract -> chunk -> embed/store ingestion pipeline
+"""
+
+import asyncio
+from typing import List, AsyncIterator, Callable, Awaitable, Optional
+from loguru import logger
+
+from app.models.document import DocumentChunk
+from app.services.chunking import TextChunker, PageText
+
+_END = object()  # Sentinel marking the end of a stage's output
+
+
+async def run_ingestion_pipeline(
+    pages: AsyncIterator[PageText],
+    chunker: TextChunker,
+    store_batch: Optional[Callable[[List[DocumentChunk]], Awaitable[None]]],
+    batch_size: int,
+    queue_size: int,
+    store_concurrency: int = 1
+) -> List[DocumentChunk]:
+    """
+    Run extraction, chunking and storage as concurrent stages
+
+    Pages flow into the chunker as soon as they are extracted, and full chunk
+    batches are embedded and stored while later pages are still being parsed.
+    The queues between stages are bounded, so a slow stage applies
+    backpressure instead of letting pages or chunks pile up in memory.
+    Up to store_concurrency batches are embedded at once, so a long document
+    keeps several embedding requests in flight.
+
+    Args:
+        pages: Async iterator of extracted pages, in document order
+        chunker: Chunker for the document being ingested
+        store_batch: Coroutine that embeds and stores a batch (None to skip storage)
+        batch_size: Number of chunks per storage batch
+        queue_size: Maximum number of items waiting between stages
+        store_concurrency: Maximum number of batches being stored at once
+
+    Returns:
+        All chunks produced, in order
+    """
+    page_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    batch_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    all_chunks: List[DocumentChunk] = []
+
+    async def extract_stage():
+        async for page in pages:
+            await page_queue.put(page)
+        await page_queue.put(_END)
+
+    async def chunk_stage():
+        batch: List[DocumentChunk] = []
+        while (page := await page_queue.get()) is not _END:
+            for chunk in chunker.feed(page.text, page.page_number, page.extractor):
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    await batch_queue.put(batch)
+                    batch = []
+
+        batch.extend(chunker.finish())
+        if batch:
+            await batch_queue.put(batch)
+        await batch_queue.put(_END)
+
+    async def store_one(batch: List[DocumentChunk]):
+        try:
+            await store_batch(batch)
+            logger.debug(f"Ingestion pipeline stored batch of {len(batch)} chunks")
+        finally:
+            store_slots.release()
+
+    async def store_stage(group: asyncio.TaskGroup):
+        while (batch := await batch_queue.get()) is not _END:
+            # Chunks keep document order regardless of which batch finishes first
+            all_chunks.extend(batch)
+            if store_batch is not None:
+                await store_slots.acquire()
+                group.create_task(store_one(batch))
+
+    store_slots = asyncio.Semaphore(max(1, store_concurrency))
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(extract_stage())
+            group.create_task(chunk_stage())
+            group.create_task(store_stage(group))
+    except ExceptionGroup as e:
+        # Surface the original failure rather than the group wrapper
+        raise e.exceptions[0]
+
+    return all_chunks
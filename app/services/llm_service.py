@@ -5,23 +5,25 @@ LLM service for generating answers and reasoning using Google Gemini
 import json
 import asyncio
 from typing import List, Dict, Any, Optional
-import google.generativeai as genai
 from loguru import logger
 
 from app.core.config import settings
 from app.core.exceptions import LLMError
 from app.models.document import DocumentChunk
+from app.utils.tokens import estimate_tokens
 
 
 class LLMService:
     """Service for LLM-based text generation and reasoning using Google Gemini"""
     
     def __init__(self):
-        self.client: Optional[genai.GenerativeModel] = None
+        self.client = None  # genai.GenerativeModel, imported only when a key is configured
         self.model_name = settings.GEMINI_MODEL
         self.use_gemini = bool(settings.GEMINI_API_KEY)
         
         if self.use_gemini:
+            import google.generativeai as genai
+            
             genai.configure(api_key=settings.GEMINI_API_KEY)
             self.client = genai.GenerativeModel(self.model_name)
     
@@ -29,7 +31,7 @@ class LLMService:
         self, 
         question: str, 
         context_chunks: List[DocumentChunk],
-        max_context_length: int = 8000
+        max_context_length: int = 2000
     ) -> str:
         """
         Generate an answer to a question based on document context
@@ -37,7 +39,7 @@ class LLMService:
         Args:
             question: The user's question
             context_chunks: Relevant document chunks
-            max_context_length: Maximum context length to include
+            max_context_length: Maximum context length to include, in estimated tokens
             
         Returns:
             Generated answer string
@@ -53,6 +55,8 @@ class LLMService:
             prompt = self._create_answer_prompt(question, context)
             
             # Generate response using Gemini
+            import google.generativeai as genai
+            
             response = await asyncio.to_thread(
                 self.client.generate_content,
                 prompt,
@@ -86,6 +90,8 @@ class LLMService:
 Please respond in valid JSON format only. Do not include any text outside the JSON structure.
 """
             
+            import google.generativeai as genai
+            
             response = await asyncio.to_thread(
                 self.client.generate_content,
                 structured_prompt,
@@ -115,7 +121,7 @@ Please respond in valid JSON format only. Do not include any text outside the JS
             return None
     
     def _prepare_context(self, chunks: List[DocumentChunk], max_length: int) -> str:
-        """Prepare context string from document chunks"""
+        """Prepare context string from document chunks, up to max_length estimated tokens"""
         if not chunks:
             return "No relevant context found."
         
@@ -132,11 +138,13 @@ Please respond in valid JSON format only. Do not include any text outside the JS
         for i, chunk in enumerate(sorted_chunks):
             chunk_text = f"[Context {i+1}] {chunk.content}"
             
-            if current_length + len(chunk_text) > max_length:
+            chunk_tokens = estimate_tokens(chunk_text)
+            
+            if current_length + chunk_tokens > max_length:
                 break
             
             context_parts.append(chunk_text)
-            current_length += len(chunk_text)
+            current_length += chunk_tokens
         
         return "\n\n".join(context_parts)
     
@@ -216,7 +224,7 @@ QUESTION: {question}
 
 ANSWER: {answer}
 
-CONTEXT: {self._prepare_context(context_chunks, 2000)}
+CONTEXT: {self._prepare_context(context_chunks, 500)}
 
 Please evaluate on these criteria:
 1. Accuracy: Is the answer factually correct based on the context?
@@ -0,0 +1,162 @@
+"""
+Local embedding model loading and its micro-batching inference worker
+"""
+
+import time
+import queue
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from loguru import logger
+
+_STOP = object()  # Sentinel that shuts the worker down
+
+LOCAL_BACKENDS = ("fp32", "int8")
+
+
+def load_local_model(model_name: str, backend: str = "fp32", threads: int = 0, max_seq_length: int = 0):
+    """
+    Load a SentenceTransformer for CPU inference
+
+    Args:
+        model_name: SentenceTransformer model to load
+        backend: "fp32" for the model as published, or "int8" for a copy whose
+            Linear layers are dynamically quantized (int8 weights, activations
+            quantized on the fly); its speed and accuracy are unmeasured, so
+            check it with scripts/benchmark_local_embeddings.py before use
+        threads: Intra-op threads for torch (0 keeps torch's default)
+        max_seq_length: Truncate inputs to this many tokens (0 keeps the model's default)
+    """
+    if backend not in LOCAL_BACKENDS:
+        raise ValueError(f"Unknown local embedding backend '{backend}', expected one of {LOCAL_BACKENDS}")
+
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+    model = SentenceTransformer(model_name, device="cpu")
+    if max_seq_length > 0:
+        model.max_seq_length = max_seq_length
+
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    model.eval()
+    return model
+
+
+@dataclass
+class _EmbeddingRequest:
+    """Texts from one caller and the future its vectors are delivered to"""
+    texts: List[str]
+    future: asyncio.Future
+    loop: asyncio.AbstractEventLoop
+
+
+class LocalEmbeddingWorker:
+    """
+    Runs a SentenceTransformer on a dedicated thread, batching concurrent callers
+
+    Callers enqueue their texts and await a future. The worker takes the first
+    waiting request, then keeps gathering requests for up to max_wait_ms or
+    until max_batch_size texts are collected, encodes them in a single forward
+    pass and hands each caller its slice. Many small query embeddings thus
+    share one pass, and encoding never blocks the event loop.
+    """
+
+    def __init__(self, model, max_batch_size: int, max_wait_ms: float):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests: "queue.Queue" = queue.Queue()
+        self._pending: Optional[_EmbeddingRequest] = None
+        self._thread = threading.Thread(target=self._run, name="local-embedding-worker", daemon=True)
+        self._thread.start()
+
+    async def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts on the worker thread, returning one vector per text"""
+        if not self._thread.is_alive():
+            raise RuntimeError("Local embedding worker is not running")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests.put(_EmbeddingRequest(texts, future, loop))
+        return await future
+
+    def close(self):
+        """Stop the worker after the requests already queued"""
+        if self._thread.is_alive():
+            self.requests.put(_STOP)
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        """Worker loop: collect a micro-batch, encode it, deliver the results"""
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+
+            texts = [text for request in batch for text in request.texts]
+            try:
+                embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+            except Exception as e:
+                for request in batch:
+                    self._deliver(request, error=e)
+                continue
+
+            offset = 0
+            for request in batch:
+                count = len(request.texts)
+                self._deliver(request, result=list(embeddings[offset:offset + count]))
+                offset += count
+
+            if len(batch) > 1:
+                logger.debug(f"Encoded {len(texts)} texts from {len(batch)} requests in one batch")
+
+    def _collect_batch(self) -> Optional[List[_EmbeddingRequest]]:
+        """Block for a request, then gather more until the batch is full or the window closes"""
+        first = self._pending or self.requests.get()
+        self._pending = None
+        if first is _STOP:
+            return None
+
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if request is _STOP or size + len(request.texts) > self.max_batch_size:
+                # Leave it for the next batch rather than overflowing this one
+                self._pending = request
+                break
+            batch.append(request)
+            size += len(request.texts)
+
+        return batch
+
+    @staticmethod
+    def _deliver(request: _EmbeddingRequest, result=None, error: Optional[Exception] = None):
+        """Resolve a caller's future on its own event loop"""
+        def resolve():
+            if request.future.done():
+                return  # Caller was cancelled
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+        try:
+            request.loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            pass  # Caller's loop has closed
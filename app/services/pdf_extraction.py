@@ -0,0 +1,48 @@
+"""
+PDF text extraction workers that run inside a process pool
+
+Functions here are module-level so they can be pickled and executed in
+worker processes; each opens its own document handle from a path or bytes.
+PyMuPDF and pdfplumber are imported on first use, so only the workers that
+extract pages pay for loading them.
+"""
+
+import io
+from typing import List, Sequence, Union
+
+PdfSource = Union[str, bytes]
+
+
+def _open_fitz(source: PdfSource) -> "fitz.Document":
+    """Open a PDF with PyMuPDF from a path or in-memory bytes"""
+    import fitz  # PyMuPDF
+
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def count_pdf_pages(source: PdfSource) -> int:
+    """Return the number of pages in a PDF"""
+    doc = _open_fitz(source)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def extract_pages_pymupdf(source: PdfSource, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) with PyMuPDF"""
+    doc = _open_fitz(source)
+    try:
+        return [doc[page_number].get_text() for page_number in range(start, end)]
+    finally:
+        doc.close()
+
+
+def extract_pages_pdfplumber(source: PdfSource, page_numbers: Sequence[int]) -> List[str]:
+    """Extract the text of the given pages with pdfplumber"""
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source) as pdf:
+        return [pdf.pages[page_number].extract_text() or "" for page_number in page_numbers]
@@ -24,8 +24,8 @@ class QueryStructure:
 class QueryProcessor:
     """Service for processing and understanding user queries"""
     
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        self.llm_service = llm_service or LLMService()
         
         # Common patterns for different types of queries
         self.intent_patterns = {
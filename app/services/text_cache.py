@@ -0,0 +1,196 @@
+"""
+Disk-backed cache of extracted document text for URL sources
+"""
+
+import os
+import json
+import time
+import hashlib
+import asyncio
+import uuid
+from typing import List, Dict, Any, Optional, AsyncIterator
+from pathlib import Path
+from loguru import logger
+
+from app.services.chunking import PageText
+
+# Bump when extractor output changes so cached text is re-extracted
+EXTRACTION_VERSION = 2
+
+
+class ExtractedTextCache:
+    """
+    Extracted page text for downloaded documents, revalidated with HTTP validators
+
+    Each entry holds the ETag/Last-Modified values the server sent, the
+    document metadata and the extracted pages (one JSON line per page). Repeat
+    downloads send If-None-Match/If-Modified-Since; on 304 Not Modified the
+    cached text is reused without downloading or parsing anything. Entries
+    are evicted least-recently-used once the cached text exceeds max_bytes.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get the cache entry for a URL, if its text is cached"""
+        entry = self.entries.get(url)
+        if entry is None or entry.get("version") != EXTRACTION_VERSION:
+            return None
+        if not (self.path / entry["file"]).exists():
+            return None
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Build revalidation request headers from a cache entry"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def read_pages(self, url: str) -> Optional[List[PageText]]:
+        """
+        Read the cached pages of a document and mark it recently used
+
+        Returns None when another request evicted the entry after get(), so
+        the caller can download the document again.
+        """
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        try:
+            pages = await asyncio.to_thread(self._read_pages, self.path / entry["file"])
+        except FileNotFoundError:
+            return None
+        await self._touch(url)
+        return pages
+
+    async def capture(
+        self,
+        url: str,
+        validators: Dict[str, Optional[str]],
+        metadata: Dict[str, Any],
+        pages: AsyncIterator[PageText]
+    ) -> AsyncIterator[PageText]:
+        """
+        Pass extracted pages through while recording them
+
+        The entry is only written once the whole document has been extracted,
+        so a failed or abandoned extraction never leaves partial text behind.
+        """
+        captured: List[PageText] = []
+        async for page in pages:
+            captured.append(page)
+            yield page
+
+        try:
+            await self._store(url, validators, metadata, captured)
+        except Exception as e:
+            logger.warning(f"Failed to cache extracted text for {url}: {str(e)}")
+
+    async def clear(self):
+        """Remove all entries and their cached text"""
+        async with self._lock:
+            for entry in self.entries.values():
+                self._remove_file(entry)
+            self.entries = {}
+            await asyncio.to_thread(self._save)
+
+    async def _store(
+        self,
+        url: str,
+        validators: Dict[str, Optional[str]],
+        metadata: Dict[str, Any],
+        pages: List[PageText]
+    ):
+        """Write a document's pages and index entry, then evict down to max_bytes"""
+        file_name = f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.jsonl"
+        size = await asyncio.to_thread(self._write_pages, self.path / file_name, pages)
+
+        async with self._lock:
+            self.entries[url] = {
+                "version": EXTRACTION_VERSION,
+                "file": file_name,
+                "size": size,
+                "etag": validators.get("etag"),
+                "last_modified": validators.get("last_modified"),
+                "metadata": metadata,
+                "last_used": time.time()
+            }
+            self._evict()
+            await asyncio.to_thread(self._save)
+
+        logger.debug(f"Cached {len(pages)} extracted pages ({size} bytes) for {url}")
+
+    async def _touch(self, url: str):
+        """Mark an entry as recently used"""
+        async with self._lock:
+            if url in self.entries:
+                self.entries[url]["last_used"] = time.time()
+                await asyncio.to_thread(self._save)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = sum(entry["size"] for entry in self.entries.values())
+        for url, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            self._remove_file(entry)
+            del self.entries[url]
+            total -= entry["size"]
+            logger.debug(f"Evicted cached text for {url}")
+
+    def _remove_file(self, entry: Dict[str, Any]):
+        """Delete an entry's text file if present"""
+        try:
+            os.unlink(self.path / entry["file"])
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _write_pages(file_path: Path, pages: List[PageText]) -> int:
+        """Write pages as JSON lines atomically and return the file size"""
+        tmp_path = file_path.with_name(f"{file_path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for page in pages:
+                f.write(json.dumps(list(page)) + "\n")
+        os.replace(tmp_path, file_path)
+        return file_path.stat().st_size
+
+    @staticmethod
+    def _read_pages(file_path: Path) -> List[PageText]:
+        """Read pages written by _write_pages"""
+        with open(file_path, "r", encoding="utf-8") as f:
+            return [PageText(*json.loads(line)) for line in f]
+
+    def _load(self):
+        """Load the cache index from disk"""
+        index_path = self.path / self.INDEX_FILE
+        if not index_path.exists():
+            return
+
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+            logger.info(f"Loaded extracted-text cache with {len(self.entries)} documents")
+        except Exception as e:
+            logger.warning(f"Failed to load extracted-text cache, starting empty: {str(e)}")
+            self.entries = {}
+
+    def _save(self):
+        """Write the cache index atomically"""
+        index_path = self.path / self.INDEX_FILE
+        tmp_path = index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, index_path)
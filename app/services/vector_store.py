@@ -3,10 +3,9 @@ Vector store service for semantic search and document storage
 """
 
 import os
-import pickle
+import shutil
 import asyncio
 from typing import List, Optional, Dict, Any
-import numpy as np
 import faiss
 from pathlib import Path
 from loguru import logger
@@ -15,22 +14,43 @@ from app.core.config import settings
 from app.core.exceptions import VectorStoreError
 from app.models.document import DocumentChunk
 from app.services.embedding_service import EmbeddingService
+from app.services.ingestion_manifest import IngestionManifest
+from app.services.index_namespaces import NamespacePointer, namespace_for
+from app.services.faiss_index import normalized
+from app.services.faiss_segments import SegmentedIndex
 
 
 class VectorStoreService:
-    """FAISS-based vector store for document chunks"""
+    """
+    FAISS-based vector store for document chunks
     
-    def __init__(self):
-        self.embedding_service = EmbeddingService()
-        self.index: Optional[faiss.Index] = None
-        self.chunks: List[DocumentChunk] = []
+    Each embedding model gets its own namespace directory holding its index
+    segments (see SegmentedIndex) and ingestion manifest; faiss_namespace.json names the one serving
+    queries. When the configured model changes, the corpus is re-embedded
+    into the new namespace in the background while the old one keeps serving,
+    and the store switches over atomically once the copy has caught up.
+    """
+    
+    # Fields that make up one namespace's state, swapped together on migration
+    NAMESPACE_FIELDS = (
+        'embedding_service', 'index', 'dimension', 'namespace', 'index_path', 'manifest'
+    )
+    
+    def __init__(self, embedding_service: Optional[EmbeddingService] = None):
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.index: Optional[SegmentedIndex] = None
         self.dimension = settings.EMBEDDING_DIMENSION
-        self.index_path = Path(settings.VECTOR_DB_PATH)
-        self.chunks_path = self.index_path / "chunks.pkl"
-        self.faiss_index_path = self.index_path / "faiss.index"
+        self.root_path = Path(settings.VECTOR_DB_PATH)
+        self.pointer = NamespacePointer(self.root_path / "faiss_namespace.json")
+        self.namespace: Optional[str] = None
+        self.index_path: Optional[Path] = None
+        self.manifest: Optional[IngestionManifest] = None
+        self.migration_task: Optional[asyncio.Task] = None
+        self.migration_status: Optional[Dict[str, Any]] = None
+        self._migration_target: Optional["VectorStoreService"] = None
         
         # Create directory if it doesn't exist
-        self.index_path.mkdir(parents=True, exist_ok=True)
+        self.root_path.mkdir(parents=True, exist_ok=True)
     
     async def initialize(self):
         """Initialize the vector store"""
@@ -39,92 +59,304 @@ class VectorStoreService:
             
             # Initialize embedding service
             await self.embedding_service.initialize()
+            model = self.embedding_service.model_name
+            self.dimension = self.embedding_service.get_dimension()
+            
+            active = self.pointer.read() or self._adopt_legacy_layout()
+            if active is not None and active.get('model') != model:
+                await self._start_migration(active)
+                return
+            
+            self._use_namespace(namespace_for(model))
             
             # Try to load existing index
             if await self._load_existing_index():
-                logger.info(f"Loaded existing vector store with {len(self.chunks)} chunks")
+                logger.info(f"Loaded existing vector store with {self.index.ntotal} chunks")
             else:
                 logger.info("Creating new vector store")
                 self._create_new_index()
+            self.pointer.write(self.namespace, model, self.dimension)
                 
         except Exception as e:
             raise VectorStoreError(f"Failed to initialize vector store: {str(e)}")
     
-    async def store_documents(self, chunks: List[DocumentChunk]):
-        """Store document chunks in the vector store"""
+    def _use_namespace(self, namespace: str):
+        """Point this instance's files and manifest at a namespace"""
+        self.namespace = namespace
+        self.index_path = self.root_path / "namespaces" / namespace
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        self.manifest = IngestionManifest(
+            self.index_path / "manifest.json",
+            embedding_model=self.embedding_service.model_name
+        )
+    
+    def _adopt_legacy_layout(self) -> Optional[Dict[str, Any]]:
+        """
+        Move an index saved before namespaces existed into a namespace
+        
+        Its model was never recorded; an index whose dimension matches the
+        current model is assumed to come from it, anything else is treated
+        as an unknown model and re-embedded.
+        """
+        legacy_index = self.root_path / "faiss.index"
+        legacy_chunks = self.root_path / "chunks.pkl"
+        if not legacy_index.exists() or not legacy_chunks.exists():
+            return None
+        
+        dimension = faiss.read_index(str(legacy_index)).d
+        model = self.embedding_service.model_name if dimension == self.dimension else None
+        namespace = namespace_for(model) if model else f"legacy-{dimension}"
+        
+        target = self.root_path / "namespaces" / namespace
+        target.mkdir(parents=True, exist_ok=True)
+        for name in ("faiss.index", "index.json", "chunks.pkl", "manifest.json"):
+            if (self.root_path / name).exists():
+                os.replace(self.root_path / name, target / name)
+        
+        logger.info(f"Moved legacy vector store (dimension {dimension}) into namespace {namespace}")
+        return {"namespace": namespace, "model": model, "dimension": dimension}
+    
+    async def _start_migration(self, active: Dict[str, Any]):
+        """Open the active namespace and the current model's namespace, and start re-embedding"""
+        source_service = None
+        if active.get('model'):
+            try:
+                # Keep the previous model loaded so the old namespace can answer queries
+                source_service = EmbeddingService(cache=self.embedding_service.cache, model=active['model'])
+                await source_service.initialize()
+            except Exception as e:
+                logger.warning(f"Cannot load {active['model']} to serve during migration: {str(e)}")
+                source_service = None
+        
+        source = VectorStoreService(embedding_service=source_service or self.embedding_service)
+        source._use_namespace(active['namespace'])
+        source.dimension = active.get('dimension', self.dimension)
+        
+        target = VectorStoreService(embedding_service=self.embedding_service)
+        target.dimension = self.dimension
+        target._use_namespace(namespace_for(self.embedding_service.model_name))
+        # Resume a migration interrupted by a restart: stored chunk IDs are skipped
+        if not await target._load_existing_index():
+            target._create_new_index()
+        
+        if not await source._load_existing_index() or source.index.ntotal == 0:
+            logger.info(f"Namespace {active['namespace']} is empty, switching to {target.namespace}")
+            self._adopt(target)
+            self.pointer.write(self.namespace, self.embedding_service.model_name, self.dimension)
+            return
+        
+        # Serve the old namespace when its model is available, else the new one as it fills
+        self._adopt(source if source_service is not None else target)
+        self._migration_target = target
+        self.migration_task = asyncio.create_task(self._migrate(source, target))
+    
+    async def _migrate(self, source: "VectorStoreService", target: "VectorStoreService"):
+        """Re-embed every chunk of source into target, then make target the serving namespace"""
+        batch_size = max(1, settings.EMBEDDING_MIGRATION_BATCH_SIZE)
+        copied = 0
+        self.migration_status = {"from": source.namespace, "to": target.namespace, "copied": 0, "total": source.index.ntotal}
+        logger.info(f"Re-embedding {source.index.ntotal} chunks from namespace {source.namespace} into {target.namespace}")
+        
         try:
-            logger.info(f"Storing {len(chunks)} document chunks...")
-            
-            # Generate embeddings for all chunks
-            embeddings = await self.embedding_service.generate_embeddings(
-                [chunk.content for chunk in chunks]
-            )
+            while True:
+                # Chunks are only ever appended, so new ingestion shows up past `copied`
+                while copied < source.index.ntotal:
+                    batch = source.index.chunks_at(range(copied, min(copied + batch_size, source.index.ntotal)))
+                    await target.store_documents(batch, commit=False)
+                    copied += len(batch)
+                    self.migration_status.update(copied=copied, total=source.index.ntotal)
+                
+                target.manifest.merge(source.manifest)
+                await target._save_index()
+                await target.manifest.save()
+                
+                if copied == source.index.ntotal:
+                    break
             
-            # Add embeddings to chunks
-            for chunk, embedding in zip(chunks, embeddings):
-                chunk.set_embedding(embedding)
+            # Nothing awaits from here on, so no write can slip in before the switch
+            target.manifest.merge(source.manifest)
+            self.pointer.write(target.namespace, target.embedding_service.model_name, target.dimension)
+            self._adopt(target)
+            self._migration_target = None
+            self.migration_status = None
+            logger.success(f"Switched vector store to namespace {target.namespace} ({copied} chunks)")
             
-            # Add to FAISS index
-            embeddings_array = np.array([chunk.get_embedding() for chunk in chunks]).astype('float32')
+            await self.manifest.save()
+            if source.embedding_service is not target.embedding_service:
+                source.embedding_service.close()
+            await source.index.close()
+            await asyncio.to_thread(shutil.rmtree, source.index_path, True)
             
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Namespace migration to {target.namespace} failed, will resume on restart: {str(e)}")
+            self.migration_status = {**(self.migration_status or {}), "error": str(e)}
+    
+    def _adopt(self, other: "VectorStoreService"):
+        """Take over another instance's namespace state"""
+        for field in self.NAMESPACE_FIELDS:
+            setattr(self, field, getattr(other, field))
+    
+    async def store_documents(self, chunks: List[DocumentChunk], commit: bool = True):
+        """
+        Store document chunks in the vector store
+        
+        Args:
+            chunks: Chunks to embed and store
+            commit: Persist and record the documents in the manifest right away.
+                Streaming ingestion passes False per batch and calls
+                commit_document() once the whole document is stored.
+        """
+        try:
             if self.index is None:
                 self._create_new_index()
             
-            # Add vectors to index
-            start_id = len(self.chunks)
-            self.index.add(embeddings_array)
+            while True:
+                index, embedding_service = self.index, self.embedding_service
+                
+                # Skip chunks that are already indexed (e.g. resolved through the manifest)
+                pending = [chunk for chunk in chunks if index.position_of(chunk.id) is None]
+                if not pending:
+                    logger.info("All document chunks already stored, nothing to embed")
+                    return
+                
+                logger.info(f"Storing {len(pending)} document chunks...")
+                
+                # Generate embeddings for all chunks
+                embeddings = await embedding_service.generate_embeddings(
+                    [chunk.content for chunk in pending]
+                )
+                if self.index is index:
+                    break
+                # A migration switched namespaces meanwhile; these vectors come from the old model
+                logger.info(f"Vector store switched to namespace {self.namespace} while embedding, re-embedding")
+            chunks = pending
+            
+            # One float32 matrix, normalized so inner product is cosine similarity;
+            # chunks keep views of its rows rather than copies
+            embeddings_array = normalized(embeddings)
+            
+            # A concurrent request for the same document may have stored some of
+            # these chunks while this one was embedding; nothing awaits from here
+            # to the add, so this check cannot go stale
+            new = [i for i, chunk in enumerate(chunks) if self.index.position_of(chunk.id) is None]
+            if len(new) < len(chunks):
+                chunks = [chunks[i] for i in new]
+                embeddings_array = embeddings_array[new]
+                if not chunks:
+                    logger.info("Document chunks were stored by a concurrent request, nothing to add")
+                    return
+            
+            for chunk, embedding in zip(chunks, embeddings_array):
+                chunk.set_embedding(embedding)
             
             # Store chunks with their IDs
+            start_id = self.index.ntotal
             for i, chunk in enumerate(chunks):
                 chunk.metadata['vector_id'] = start_id + i
-                self.chunks.append(chunk)
             
-            # Save to disk
-            await self._save_index()
+            # Add vectors to the live segment
+            self.index.add(embeddings_array, chunks)
             
-            logger.info(f"Successfully stored {len(chunks)} chunks. Total chunks: {len(self.chunks)}")
+            if commit:
+                # Save to disk
+                await self._save_index()
+                await self._record_manifest(chunks)
+            
+            logger.info(f"Successfully stored {len(chunks)} chunks. Total chunks: {self.index.ntotal}")
             
         except Exception as e:
             raise VectorStoreError(f"Failed to store documents: {str(e)}")
     
     async def search(self, query: str, top_k: int = 10) -> List[DocumentChunk]:
         """Search for relevant document chunks"""
+        results = await self.search_many([query], top_k=top_k)
+        return results[0]
+    
+    async def search_many(self, queries: List[str], top_k: int = 10) -> List[List[DocumentChunk]]:
+        """
+        Search for relevant document chunks for several queries at once
+        
+        All queries are embedded in one batch and looked up with a single
+        (n, d) FAISS search.
+        
+        Returns:
+            One list of chunks per query, in query order
+        """
         try:
-            if self.index is None or len(self.chunks) == 0:
-                logger.warning("Vector store is empty, returning no results")
+            if not queries:
                 return []
             
-            # Generate query embedding
-            query_embeddings = await self.embedding_service.generate_embeddings([query])
-            query_embedding = query_embeddings[0]  # Get the first (and only) embedding
-            query_vector = np.array([query_embedding]).astype('float32')
+            if self.index is None or self.index.ntotal == 0:
+                logger.warning("Vector store is empty, returning no results")
+                return [[] for _ in queries]
+            
+            # Generate all query embeddings in one batch
+            query_embeddings = await self.embedding_service.generate_embeddings(queries)
+            query_matrix = normalized(query_embeddings)
             
             # Search in FAISS index
-            scores, indices = self.index.search(query_vector, min(top_k, len(self.chunks)))
+            total = self.index.ntotal
+            scores, indices = self.index.search(query_matrix, min(top_k, total))
             
-            # Return matching chunks
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.chunks):  # Valid index
-                    chunk = self.chunks[idx]
-                    # Add similarity score to metadata
-                    chunk.metadata['similarity_score'] = float(score)
-                    results.append(chunk)
+            # Build chunk models for the top hits only
+            all_results = []
+            for row_scores, row_indices in zip(scores, indices):
+                hits = [(float(score), int(idx)) for score, idx in zip(row_scores, row_indices) if 0 <= idx < total]
+                results = self.index.chunks_at([idx for _, idx in hits])
+                for chunk, (score, _) in zip(results, hits):
+                    chunk.metadata['similarity_score'] = score
+                all_results.append(results)
             
-            logger.info(f"Found {len(results)} relevant chunks for query: {query[:50]}...")
-            return results
+            logger.info(f"Found {sum(len(results) for results in all_results)} relevant chunks for {len(queries)} queries")
+            return all_results
             
         except Exception as e:
             raise VectorStoreError(f"Failed to search vector store: {str(e)}")
     
+    async def update_chunk_metadata(self, updates: Dict[str, Dict[str, Any]]):
+        """Merge metadata into stored chunks; persisted with the next save"""
+        for chunk_id, metadata in updates.items():
+            position = self.index.position_of(chunk_id)
+            if position is not None:
+                self.index.update_metadata(position, metadata)
+        
+        # Keep a namespace being migrated in step with the serving one
+        if self._migration_target is not None and self._migration_target.index is not self.index:
+            await self._migration_target.update_chunk_metadata(updates)
+    
+    async def lookup_document(self, content_hash: str) -> Optional[List[DocumentChunk]]:
+        """Return the stored chunks of an already ingested document, or None if unknown"""
+        entry = self.manifest.get(content_hash)
+        if entry is None:
+            return None
+        
+        positions = [self.index.position_of(chunk_id) for chunk_id in entry['chunk_ids']]
+        if any(position is None for position in positions):
+            # Manifest and index disagree; fall back to re-ingesting the document
+            return None
+        
+        return self.index.chunks_at(positions)
+    
     async def clear(self):
         """Clear all data from the vector store"""
         try:
             logger.info("Clearing vector store...")
+            target = await self._cancel_migration()
+            if target is not None:
+                # Nothing is left to migrate; start over empty in the current model's namespace
+                previous_service, previous_index, previous_path = self.embedding_service, self.index, self.index_path
+                self._adopt(target)
+                self.pointer.write(self.namespace, self.embedding_service.model_name, self.dimension)
+                if previous_service is not self.embedding_service:
+                    previous_service.close()
+                if previous_path != self.index_path:
+                    await previous_index.close()
+                    await asyncio.to_thread(shutil.rmtree, previous_path, True)
             
-            self.chunks = []
-            self._create_new_index()
-            await self._save_index()
+            await self.index.clear()
+            await self.manifest.clear()
             
             logger.info("Vector store cleared successfully")
             
@@ -134,57 +366,98 @@ class VectorStoreService:
     async def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics"""
         return {
-            "total_chunks": len(self.chunks),
+            "total_chunks": self.index.ntotal if self.index else 0,
             "index_size": self.index.ntotal if self.index else 0,
             "dimension": self.dimension,
-            "index_type": type(self.index).__name__ if self.index else None
+            "index_type": "FAISS segments",
+            "segments": self.index.describe() if self.index else None,
+            "namespace": self.namespace,
+            "embedding_model": self.embedding_service.model_name,
+            "migration": self.migration_status
         }
     
     async def close(self):
         """Close the vector store and save data"""
         try:
-            if self.index is not None and len(self.chunks) > 0:
+            target = await self._cancel_migration()
+            if target is not None and target.index is not self.index:
+                await target.index.close()
+                if target.embedding_service is not self.embedding_service:
+                    target.embedding_service.close()
+            if self.index is not None:
                 await self._save_index()
+                await self.index.close()
+            self.embedding_service.close()
             logger.info("Vector store closed successfully")
         except Exception as e:
             logger.error(f"Error closing vector store: {str(e)}")
     
+    async def _cancel_migration(self) -> Optional["VectorStoreService"]:
+        """
+        Stop a running namespace migration, returning its target store
+        
+        The target keeps what it has saved, so a restart resumes the migration.
+        """
+        if self.migration_task is not None and not self.migration_task.done():
+            self.migration_task.cancel()
+            try:
+                await self.migration_task
+            except asyncio.CancelledError:
+                pass
+        
+        target = self._migration_target
+        self.migration_task = None
+        self._migration_target = None
+        self.migration_status = None
+        return target
+    
     def _create_new_index(self):
-        """Create a new FAISS index"""
-        # Use IndexFlatIP for cosine similarity (after L2 normalization)
-        self.index = faiss.IndexFlatIP(self.dimension)
+        """Create a new, empty FAISS index"""
+        self.index = SegmentedIndex(self.index_path, self.dimension)
         logger.info(f"Created new FAISS index with dimension {self.dimension}")
     
     async def _load_existing_index(self) -> bool:
-        """Load existing index from disk"""
+        """Open the index segments saved on disk"""
         try:
-            if not self.faiss_index_path.exists() or not self.chunks_path.exists():
+            index = SegmentedIndex(self.index_path, self.dimension)
+            if not index.load():
                 return False
             
-            # Load FAISS index
-            self.index = faiss.read_index(str(self.faiss_index_path))
-            
-            # Load chunks
-            with open(self.chunks_path, 'rb') as f:
-                self.chunks = pickle.load(f)
-            
+            self.index = index
             return True
             
         except Exception as e:
             logger.warning(f"Failed to load existing index: {str(e)}")
             return False
     
+    async def commit_document(self, chunks: List[DocumentChunk]):
+        """Save the index and record a fully stored document in the ingestion manifest"""
+        try:
+            await self._save_index()
+            await self._record_manifest(chunks)
+        except Exception as e:
+            raise VectorStoreError(f"Failed to commit document: {str(e)}")
+    
+    async def _record_manifest(self, chunks: List[DocumentChunk]):
+        """Record newly stored chunk IDs in the ingestion manifest, grouped by document"""
+        documents: Dict[str, List[DocumentChunk]] = {}
+        for chunk in chunks:
+            content_hash = chunk.metadata.get('content_hash')
+            if content_hash:
+                documents.setdefault(content_hash, []).append(chunk)
+        
+        for content_hash, document_chunks in documents.items():
+            await self.manifest.record(
+                content_hash,
+                [chunk.id for chunk in document_chunks],
+                document_chunks[0].metadata
+            )
+    
     async def _save_index(self):
-        """Save index and chunks to disk"""
+        """Write vectors stored since the last save as a new segment"""
         try:
             if self.index is not None:
-                # Save FAISS index
-                faiss.write_index(self.index, str(self.faiss_index_path))
-                
-                # Save chunks
-                with open(self.chunks_path, 'wb') as f:
-                    pickle.dump(self.chunks, f)
-                
+                await self.index.flush()
                 logger.debug("Vector store saved to disk")
                 
         except Exception as e:
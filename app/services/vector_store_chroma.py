@@ -1,30 +1,60 @@
 """
 ChromaDB-based vector store service for Windows compatibility
+
+chromadb is imported when the store is initialized rather than with this
+module, keeping it off the application's import path. ChromaDB's client is
+synchronous (SQLite and HNSW files on disk), so every call runs on a
+dedicated thread pool instead of blocking the event loop.
 """
 
 import os
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict, Any
-import chromadb
-from chromadb.config import Settings
 from pathlib import Path
+import numpy as np
 from loguru import logger
 
 from app.core.config import settings
 from app.core.exceptions import VectorStoreError
 from app.models.document import DocumentChunk
 from app.services.embedding_service import EmbeddingService
+from app.services.ingestion_manifest import IngestionManifest
+from app.services.index_namespaces import NamespacePointer, namespace_for
+
+LEGACY_COLLECTION_NAME = "document_chunks"  # Collection used before namespaces existed
 
 
 class ChromaVectorStoreService:
-    """ChromaDB-based vector store for document chunks (Windows compatible)"""
+    """
+    ChromaDB-based vector store for document chunks (Windows compatible)
+    
+    Each embedding model gets its own collection and ingestion manifest;
+    chroma_namespace.json names the one serving queries. When the configured
+    model changes, the corpus is re-embedded into the new collection in the
+    background and the store switches over once the copy has caught up.
+    """
+    
+    # Fields that make up one namespace's state, swapped together on migration
+    NAMESPACE_FIELDS = ('embedding_service', 'collection', 'collection_name', 'dimension', 'namespace', 'manifest')
     
-    def __init__(self):
-        self.embedding_service = EmbeddingService()
-        self.client: Optional[chromadb.Client] = None
+    def __init__(self, embedding_service: Optional[EmbeddingService] = None, client=None):
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.client = client  # chromadb client, created in initialize() or shared by the parent store
+        self.executor: Optional[ThreadPoolExecutor] = None  # Runs ChromaDB calls; shared with child stores
+        self.counts: Dict[str, int] = {}  # Chunks per collection, kept up to date on writes
+        self._write_lock = asyncio.Lock()  # Held from the namespace check to the end of each write
         self.collection = None
-        self.collection_name = "document_chunks"
+        self.collection_name: Optional[str] = None
+        self.namespace: Optional[str] = None
+        self.dimension = settings.EMBEDDING_DIMENSION
         self.db_path = Path(settings.VECTOR_DB_PATH)
+        self.pointer = NamespacePointer(self.db_path / "chroma_namespace.json")
+        self.manifest: Optional[IngestionManifest] = None
+        self.migration_task: Optional[asyncio.Task] = None
+        self.migration_status: Optional[Dict[str, Any]] = None
+        self._migration_target: Optional["ChromaVectorStoreService"] = None
         
         # Create directory if it doesn't exist
         self.db_path.mkdir(parents=True, exist_ok=True)
@@ -36,180 +66,554 @@ class ChromaVectorStoreService:
             
             # Initialize embedding service
             await self.embedding_service.initialize()
+            model = self.embedding_service.model_name
+            self.dimension = self.embedding_service.get_dimension()
             
-            # Initialize ChromaDB client
-            self.client = chromadb.PersistentClient(
-                path=str(self.db_path),
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
-            )
+            # Initialize ChromaDB client; importing chromadb and opening the database is slow
+            self.client = await self._run(self._create_client)
             
-            # Get or create collection
-            try:
-                self.collection = self.client.get_collection(
-                    name=self.collection_name,
-                    embedding_function=None  # We'll provide embeddings manually
-                )
-                logger.info(f"Loaded existing collection with {self.collection.count()} chunks")
-            except Exception:
-                self.collection = self.client.create_collection(
-                    name=self.collection_name,
-                    embedding_function=None
-                )
-                logger.info("Created new ChromaDB collection")
+            active = self.pointer.read() or await self._run(self._adopt_legacy_collection)
+            if active is not None and active.get('model') != model:
+                await self._start_migration(active)
+                return
+            
+            self._use_namespace(namespace_for(model))
+            await self._open_collection()
+            self.pointer.write(self.namespace, model, self.dimension)
                 
         except Exception as e:
             raise VectorStoreError(f"Failed to initialize ChromaDB vector store: {str(e)}")
     
-    async def store_documents(self, chunks: List[DocumentChunk]):
-        """Store document chunks in the vector store"""
+    def _create_client(self):
+        """Import chromadb and open the persistent database"""
+        import chromadb
+        from chromadb.config import Settings
+        
+        return chromadb.PersistentClient(
+            path=str(self.db_path),
+            settings=Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+    
+    async def _run(self, function, *args, **kwargs):
+        """Run a blocking ChromaDB call on the store's thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(function, *args, **kwargs))
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the ChromaDB thread pool, creating it on first use"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.CHROMA_EXECUTOR_THREADS),
+                thread_name_prefix="chroma"
+            )
+        return self.executor
+    
+    def _child(self, embedding_service: EmbeddingService) -> "ChromaVectorStoreService":
+        """A store for another namespace sharing this store's client, thread pool, counts and write lock"""
+        child = ChromaVectorStoreService(embedding_service=embedding_service, client=self.client)
+        child.executor = self._get_executor()
+        child.counts = self.counts
+        child._write_lock = self._write_lock
+        return child
+    
+    @property
+    def count(self) -> int:
+        """Number of chunks in this namespace's collection, without querying ChromaDB"""
+        return self.counts.get(self.collection_name, 0)
+    
+    def _use_namespace(self, namespace: str):
+        """Point this instance's collection and manifest at a namespace"""
+        self.namespace = namespace
+        self.collection_name = self._collection_name(namespace)
+        self.manifest = IngestionManifest(
+            self.db_path / f"manifest_{namespace}.json",
+            embedding_model=self.embedding_service.model_name
+        )
+    
+    @staticmethod
+    def _collection_name(namespace: str) -> str:
+        """Collection name for a namespace, within ChromaDB's 63 character limit"""
+        return f"document_chunks_{namespace}"[:63].rstrip("._-")
+    
+    async def _open_collection(self):
+        """Get or create this namespace's collection and count its chunks"""
+        self.collection, self.counts[self.collection_name] = await self._run(self._get_or_create_collection)
+        logger.info(f"Opened ChromaDB collection {self.collection_name} with {self.count} chunks")
+    
+    def _get_or_create_collection(self):
+        """Return this namespace's collection and its size (runs on the thread pool)"""
+        try:
+            collection = self.client.get_collection(
+                name=self.collection_name,
+                embedding_function=None  # We'll provide embeddings manually
+            )
+        except Exception:
+            collection = self.client.create_collection(
+                name=self.collection_name,
+                embedding_function=None,
+                metadata={"embedding_model": self.embedding_service.model_name, "dimension": self.dimension}
+            )
+        return collection, collection.count()
+    
+    def _adopt_legacy_collection(self) -> Optional[Dict[str, Any]]:
+        """
+        Rename the collection used before namespaces existed into a namespace
+        
+        Its model was never recorded; a collection whose dimension matches the
+        current model is assumed to come from it, anything else is treated as
+        an unknown model and re-embedded.
+        """
         try:
-            logger.info(f"Storing {len(chunks)} document chunks in ChromaDB...")
+            collection = self.client.get_collection(name=LEGACY_COLLECTION_NAME, embedding_function=None)
+        except Exception:
+            return None
+        
+        sample = collection.get(limit=1, include=["embeddings"])
+        if not sample['ids']:
+            self.client.delete_collection(LEGACY_COLLECTION_NAME)
+            return None
+        
+        dimension = len(sample['embeddings'][0])
+        model = self.embedding_service.model_name if dimension == self.dimension else None
+        namespace = namespace_for(model) if model else f"legacy-{dimension}"
+        
+        collection.modify(name=self._collection_name(namespace))
+        if (self.db_path / "manifest.json").exists():
+            os.replace(self.db_path / "manifest.json", self.db_path / f"manifest_{namespace}.json")
+        
+        logger.info(f"Moved legacy ChromaDB collection (dimension {dimension}) into namespace {namespace}")
+        return {"namespace": namespace, "model": model, "dimension": dimension}
+    
+    async def _start_migration(self, active: Dict[str, Any]):
+        """Open the active namespace and the current model's namespace, and start re-embedding"""
+        source_service = None
+        if active.get('model'):
+            try:
+                # Keep the previous model loaded so the old collection can answer queries
+                source_service = EmbeddingService(cache=self.embedding_service.cache, model=active['model'])
+                await source_service.initialize()
+            except Exception as e:
+                logger.warning(f"Cannot load {active['model']} to serve during migration: {str(e)}")
+                source_service = None
+        
+        source = self._child(source_service or self.embedding_service)
+        source.dimension = active.get('dimension', self.dimension)
+        source._use_namespace(active['namespace'])
+        await source._open_collection()
+        
+        # Resume a migration interrupted by a restart: stored chunk IDs are skipped
+        target = self._child(self.embedding_service)
+        target.dimension = self.dimension
+        target._use_namespace(namespace_for(self.embedding_service.model_name))
+        await target._open_collection()
+        
+        if source.count == 0:
+            logger.info(f"Namespace {active['namespace']} is empty, switching to {target.namespace}")
+            self._adopt(target)
+            self.pointer.write(self.namespace, self.embedding_service.model_name, self.dimension)
+            await self._delete_collection(source.collection_name)
+            return
+        
+        # Serve the old collection when its model is available, else the new one as it fills
+        self._adopt(source if source_service is not None else target)
+        self._migration_target = target
+        self.migration_task = asyncio.create_task(self._migrate(source, target))
+    
+    async def _migrate(self, source: "ChromaVectorStoreService", target: "ChromaVectorStoreService"):
+        """Re-embed every chunk of source into target, then make target the serving namespace"""
+        batch_size = max(1, settings.EMBEDDING_MIGRATION_BATCH_SIZE)
+        copied = 0
+        self.migration_status = {"from": source.namespace, "to": target.namespace, "copied": 0, "total": source.count}
+        logger.info(f"Re-embedding {self.migration_status['total']} chunks from namespace {source.namespace} into {target.namespace}")
+        
+        try:
+            while True:
+                # Records come back in insertion order, so new ingestion shows up past `copied`
+                while True:
+                    batch = await self._run(
+                        source.collection.get, limit=batch_size, offset=copied, include=["documents", "metadatas"]
+                    )
+                    if not batch['ids']:
+                        break
+                    await target.store_documents([
+                        self._to_chunk(chunk_id, document, metadata)
+                        for chunk_id, document, metadata in zip(batch['ids'], batch['documents'], batch['metadatas'])
+                    ], commit=False)
+                    copied += len(batch['ids'])
+                    self.migration_status.update(copied=copied, total=source.count)
+                
+                target.manifest.merge(source.manifest)
+                await target.manifest.save()
+                
+                # Writes check the namespace and store under the write lock, so while it is
+                # held none is in flight and nothing can land in source after the switch
+                async with self._write_lock:
+                    if copied >= source.count:
+                        target.manifest.merge(source.manifest)
+                        self.pointer.write(target.namespace, target.embedding_service.model_name, target.dimension)
+                        self._adopt(target)
+                        self._migration_target = None
+                        self.migration_status = None
+                        break
             
+            logger.success(f"Switched vector store to namespace {target.namespace} ({copied} chunks)")
+            
+            await self.manifest.save()
+            if source.embedding_service is not target.embedding_service:
+                source.embedding_service.close()
+            await self._delete_collection(source.collection_name)
+            if source.manifest.path.exists():
+                source.manifest.path.unlink()
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Namespace migration to {target.namespace} failed, will resume on restart: {str(e)}")
+            self.migration_status = {**(self.migration_status or {}), "error": str(e)}
+    
+    def _adopt(self, other: "ChromaVectorStoreService"):
+        """Take over another instance's namespace state"""
+        for field in self.NAMESPACE_FIELDS:
+            setattr(self, field, getattr(other, field))
+    
+    async def _cancel_migration(self) -> Optional["ChromaVectorStoreService"]:
+        """
+        Stop a running namespace migration, returning its target store
+        
+        The target collection keeps what it has stored, so a restart resumes the migration.
+        """
+        if self.migration_task is not None and not self.migration_task.done():
+            self.migration_task.cancel()
+            try:
+                await self.migration_task
+            except asyncio.CancelledError:
+                pass
+        
+        target = self._migration_target
+        self.migration_task = None
+        self._migration_target = None
+        self.migration_status = None
+        return target
+    
+    async def store_documents(self, chunks: List[DocumentChunk], commit: bool = True):
+        """
+        Store document chunks in the vector store
+        
+        Args:
+            chunks: Chunks to embed and store
+            commit: Persist and record the documents in the manifest right away.
+                Streaming ingestion passes False per batch and calls
+                commit_document() once the whole document is stored.
+        """
+        try:
             if not self.collection:
                 raise VectorStoreError("Vector store not initialized")
             
-            # Generate embeddings for all chunks
-            embeddings = await self.embedding_service.generate_embeddings(
-                [chunk.content for chunk in chunks]
-            )
+            if not chunks:
+                return
             
-            # Prepare data for ChromaDB
-            ids = []
-            documents = []
-            metadatas = []
-            embeddings_list = []
-            
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                # Generate unique ID
-                chunk_id = f"{chunk.source}_{chunk.chunk_index}_{i}"
-                ids.append(chunk_id)
-                documents.append(chunk.content)
+            while True:
+                collection, collection_name = self.collection, self.collection_name
+                embedding_service = self.embedding_service
                 
-                # Prepare metadata (ChromaDB requires string values)
-                metadata = {
-                    "source": chunk.source,
-                    "chunk_index": str(chunk.chunk_index),
-                    "start_char": str(chunk.start_char),
-                    "end_char": str(chunk.end_char)
-                }
+                # Skip chunks that are already indexed (e.g. resolved through the manifest, or
+                # copied before a migration restarted). This costs a lookup per write, but
+                # it is what keeps stored chunks from being embedded again
+                existing = await self._run(collection.get, ids=[chunk.id for chunk in chunks], include=[])
+                existing_ids = set(existing['ids'])
+                pending = [chunk for chunk in chunks if chunk.id not in existing_ids]
+                if not pending:
+                    logger.info("All document chunks already stored, nothing to embed")
+                    return
                 
-                # Add other metadata as strings
-                for key, value in chunk.metadata.items():
-                    if isinstance(value, (str, int, float, bool)):
-                        metadata[f"meta_{key}"] = str(value)
+                logger.info(f"Storing {len(pending)} document chunks in ChromaDB...")
                 
-                metadatas.append(metadata)
-                embeddings_list.append(embedding)
-            
-            # Add to ChromaDB collection
-            self.collection.add(
-                ids=ids,
-                documents=documents,
-                metadatas=metadatas,
-                embeddings=embeddings_list
-            )
+                # Generate embeddings for all chunks
+                embeddings = await embedding_service.generate_embeddings(
+                    [chunk.content for chunk in pending]
+                )
+                ids, documents, metadatas, embedding_matrix = self._records_for(pending, embeddings)
+                
+                async with self._write_lock:
+                    if self.collection is collection:
+                        added = await self._run(
+                            self._store_new, collection, ids, documents, metadatas, embedding_matrix
+                        )
+                        self.counts[collection_name] = self.counts.get(collection_name, 0) + added
+                        break
+                
+                # A migration switched namespaces meanwhile; these vectors come from the old model
+                logger.info(f"Vector store switched to namespace {self.namespace} while embedding, re-embedding")
+            chunks = pending
             
-            logger.info(f"Successfully stored {len(chunks)} chunks. Total chunks: {self.collection.count()}")
+            if commit:
+                await self._record_manifest(chunks)
+            
+            logger.info(f"Successfully stored {len(chunks)} chunks. Total chunks: {self.count}")
             
         except Exception as e:
             raise VectorStoreError(f"Failed to store documents in ChromaDB: {str(e)}")
     
+    @staticmethod
+    def _store_new(collection, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]], embeddings) -> int:
+        """
+        Store the records whose IDs are not in the collection yet, returning how many (runs on the thread pool)
+        
+        A concurrent upload of the same document may have stored some of them
+        since the lookup before embedding. Writes are serialized by the write
+        lock, so checking again here keeps the cached count exact.
+        """
+        stored = set(collection.get(ids=ids, include=[])['ids'])
+        new = [i for i, chunk_id in enumerate(ids) if chunk_id not in stored]
+        if new:
+            collection.upsert(
+                ids=[ids[i] for i in new],
+                documents=[documents[i] for i in new],
+                metadatas=[metadatas[i] for i in new],
+                embeddings=embeddings[new]
+            )
+        return len(new)
+    
+    @staticmethod
+    def _records_for(chunks: List[DocumentChunk], embeddings: List[np.ndarray]):
+        """Build the ids, documents, metadatas and embedding matrix ChromaDB stores for chunks"""
+        # One float32 matrix for the batch; chunks keep views of its rows
+        embedding_matrix = np.array(embeddings, dtype=np.float32, ndmin=2)
+        
+        ids = []
+        documents = []
+        metadatas = []
+        
+        for chunk, embedding in zip(chunks, embedding_matrix):
+            chunk.set_embedding(embedding)
+            ids.append(chunk.id)
+            documents.append(chunk.content)
+            
+            # Prepare metadata (ChromaDB requires string values)
+            metadata = {
+                "source": chunk.source,
+                "chunk_index": str(chunk.chunk_index),
+                "start_char": str(chunk.start_char),
+                "end_char": str(chunk.end_char)
+            }
+            
+            # Add other metadata as strings
+            for key, value in chunk.metadata.items():
+                if isinstance(value, (str, int, float, bool)):
+                    metadata[f"meta_{key}"] = str(value)
+            
+            metadatas.append(metadata)
+        
+        return ids, documents, metadatas, embedding_matrix
+    
     async def search(self, query: str, top_k: int = 10) -> List[DocumentChunk]:
         """Search for relevant document chunks"""
+        results = await self.search_many([query], top_k=top_k)
+        return results[0]
+    
+    async def search_many(self, queries: List[str], top_k: int = 10) -> List[List[DocumentChunk]]:
+        """
+        Search for relevant document chunks for several queries at once
+        
+        All queries are embedded in one batch and sent to ChromaDB as a single
+        query with multiple query embeddings.
+        
+        Returns:
+            One list of chunks per query, in query order
+        """
         try:
             if not self.collection:
                 raise VectorStoreError("Vector store not initialized")
             
-            if self.collection.count() == 0:
-                logger.warning("Vector store is empty, returning no results")
+            if not queries:
                 return []
             
-            # Generate query embedding
-            query_embeddings = await self.embedding_service.generate_embeddings([query])
-            query_embedding = query_embeddings[0]  # Get the first (and only) embedding
+            if self.count == 0:
+                logger.warning("Vector store is empty, returning no results")
+                return [[] for _ in queries]
+            
+            # Generate all query embeddings in one batch
+            query_embeddings = await self.embedding_service.generate_embeddings(queries)
             
-            # Search in ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=min(top_k, self.collection.count())
+            # Search in ChromaDB: one call, fetching only what the chunks are built from
+            results = await self._run(
+                self.collection.query,
+                query_embeddings=np.array(query_embeddings, dtype=np.float32, ndmin=2),
+                n_results=min(top_k, self.count),
+                include=["documents", "metadatas", "distances"]
             )
             
             # Convert results back to DocumentChunk objects
-            chunks = []
-            if results['documents'] and len(results['documents']) > 0:
-                for i in range(len(results['documents'][0])):
-                    # Extract metadata
-                    metadata = results['metadatas'][0][i]
-                    
-                    # Create DocumentChunk
-                    chunk = DocumentChunk(
-                        content=results['documents'][0][i],
-                        source=metadata.get('source', ''),
-                        chunk_index=int(metadata.get('chunk_index', 0)),
-                        start_char=int(metadata.get('start_char', 0)),
-                        end_char=int(metadata.get('end_char', 0))
-                    )
-                    
-                    # Add similarity score and other metadata
-                    chunk.metadata['similarity_score'] = float(results['distances'][0][i])
-                    
-                    # Add other metadata
-                    for key, value in metadata.items():
-                        if key.startswith('meta_'):
-                            original_key = key[5:]  # Remove 'meta_' prefix
-                            chunk.metadata[original_key] = value
-                    
-                    chunks.append(chunk)
-            
-            logger.info(f"Found {len(chunks)} relevant chunks for query: {query[:50]}...")
-            return chunks
+            all_chunks = []
+            for q in range(len(queries)):
+                chunks = []
+                if results['documents'] and len(results['documents']) > q:
+                    for i in range(len(results['documents'][q])):
+                        chunk = self._to_chunk(
+                            results['ids'][q][i],
+                            results['documents'][q][i],
+                            results['metadatas'][q][i]
+                        )
+                        
+                        # Add similarity score
+                        chunk.metadata['similarity_score'] = float(results['distances'][q][i])
+                        
+                        chunks.append(chunk)
+                all_chunks.append(chunks)
+            
+            logger.info(f"Found {sum(len(chunks) for chunks in all_chunks)} relevant chunks for {len(queries)} queries")
+            return all_chunks
             
         except Exception as e:
             raise VectorStoreError(f"Failed to search ChromaDB vector store: {str(e)}")
     
+    async def update_chunk_metadata(self, updates: Dict[str, Dict[str, Any]]):
+        """Merge metadata into stored chunks"""
+        try:
+            if not self.collection or not updates:
+                return
+            
+            metadatas = [
+                {f"meta_{key}": str(value) for key, value in metadata.items()}
+                for metadata in updates.values()
+            ]
+            await self._run(self.collection.update, ids=list(updates.keys()), metadatas=metadatas)
+            
+            # Keep a namespace being migrated in step with the serving one
+            target = self._migration_target
+            if target is not None and target.collection is not self.collection:
+                await self._run(self._update_stored, target.collection, list(updates.keys()), metadatas)
+        except Exception as e:
+            raise VectorStoreError(f"Failed to update chunk metadata in ChromaDB: {str(e)}")
+    
+    @staticmethod
+    def _update_stored(collection, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Update the metadata of those records that are already stored (runs on the thread pool)"""
+        stored = set(collection.get(ids=ids, include=[])['ids'])
+        if stored:
+            collection.update(
+                ids=[chunk_id for chunk_id in ids if chunk_id in stored],
+                metadatas=[metadata for chunk_id, metadata in zip(ids, metadatas) if chunk_id in stored]
+            )
+    
+    async def lookup_document(self, content_hash: str) -> Optional[List[DocumentChunk]]:
+        """Return the stored chunks of an already ingested document, or None if unknown"""
+        entry = self.manifest.get(content_hash)
+        if entry is None or not self.collection:
+            return None
+        
+        results = await self._run(self.collection.get, ids=entry['chunk_ids'], include=["documents", "metadatas"])
+        if len(results['ids']) != len(entry['chunk_ids']):
+            # Manifest and collection disagree; fall back to re-ingesting the document
+            return None
+        
+        chunks = [
+            self._to_chunk(chunk_id, document, metadata)
+            for chunk_id, document, metadata in zip(results['ids'], results['documents'], results['metadatas'])
+        ]
+        return sorted(chunks, key=lambda chunk: chunk.chunk_index or 0)
+    
+    def _to_chunk(self, chunk_id: str, document: str, metadata: Dict[str, Any]) -> DocumentChunk:
+        """Convert a ChromaDB record back into a DocumentChunk"""
+        chunk = DocumentChunk(
+            id=chunk_id,
+            content=document,
+            source=metadata.get('source', ''),
+            chunk_index=int(metadata.get('chunk_index', 0)),
+            start_char=int(metadata.get('start_char', 0)),
+            end_char=int(metadata.get('end_char', 0))
+        )
+        
+        # Add other metadata
+        for key, value in metadata.items():
+            if key.startswith('meta_'):
+                original_key = key[5:]  # Remove 'meta_' prefix
+                chunk.metadata[original_key] = value
+        
+        return chunk
+    
+    async def commit_document(self, chunks: List[DocumentChunk]):
+        """Record a fully stored document in the ingestion manifest (ChromaDB persists on write)"""
+        try:
+            await self._record_manifest(chunks)
+        except Exception as e:
+            raise VectorStoreError(f"Failed to commit document to ChromaDB: {str(e)}")
+    
+    async def _record_manifest(self, chunks: List[DocumentChunk]):
+        """Record newly stored chunk IDs in the ingestion manifest, grouped by document"""
+        documents: Dict[str, List[DocumentChunk]] = {}
+        for chunk in chunks:
+            content_hash = chunk.metadata.get('content_hash')
+            if content_hash:
+                documents.setdefault(content_hash, []).append(chunk)
+        
+        for content_hash, document_chunks in documents.items():
+            await self.manifest.record(
+                content_hash,
+                [chunk.id for chunk in document_chunks],
+                document_chunks[0].metadata
+            )
+    
     async def clear(self):
         """Clear all data from the vector store"""
         try:
             logger.info("Clearing ChromaDB vector store...")
+            target = await self._cancel_migration()
+            if target is not None:
+                # Nothing is left to migrate; start over empty in the current model's namespace
+                previous_service, previous_collection = self.embedding_service, self.collection_name
+                self._adopt(target)
+                self.pointer.write(self.namespace, self.embedding_service.model_name, self.dimension)
+                if previous_service is not self.embedding_service:
+                    previous_service.close()
+                if previous_collection != self.collection_name:
+                    await self._delete_collection(previous_collection)
             
             if self.collection:
                 # Delete the collection and recreate it
-                self.client.delete_collection(self.collection_name)
-                self.collection = self.client.create_collection(
-                    name=self.collection_name,
-                    embedding_function=None
-                )
+                await self._delete_collection(self.collection_name)
+                self.collection = None
+                await self._open_collection()
+            
+            await self.manifest.clear()
             
             logger.info("ChromaDB vector store cleared successfully")
             
         except Exception as e:
             raise VectorStoreError(f"Failed to clear ChromaDB vector store: {str(e)}")
     
+    async def _delete_collection(self, name: str):
+        """Delete a collection and forget its count"""
+        await self._run(self.client.delete_collection, name)
+        self.counts.pop(name, None)
+    
     async def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics"""
-        try:
-            count = self.collection.count() if self.collection else 0
-            return {
-                "total_chunks": count,
-                "index_size": count,
-                "dimension": settings.EMBEDDING_DIMENSION,
-                "index_type": "ChromaDB"
-            }
-        except Exception:
-            return {
-                "total_chunks": 0,
-                "index_size": 0,
-                "dimension": settings.EMBEDDING_DIMENSION,
-                "index_type": "ChromaDB"
-            }
+        count = self.count if self.collection else 0
+        return {
+            "total_chunks": count,
+            "index_size": count,
+            "dimension": self.dimension,
+            "index_type": "ChromaDB",
+            "namespace": self.namespace,
+            "embedding_model": self.embedding_service.model_name,
+            "migration": self.migration_status
+        }
     
     async def close(self):
         """Close the vector store"""
         try:
+            target = await self._cancel_migration()
+            if target is not None and target.embedding_service is not self.embedding_service:
+                target.embedding_service.close()
             # ChromaDB automatically persists data
+            self.embedding_service.close()
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
             logger.info("ChromaDB vector store closed successfully")
         except Exception as e:
             logger.error(f"Error closing ChromaDB vector store: {str(e)}")
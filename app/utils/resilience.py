@@ -0,0 +1,108 @@
+"""
+Rate limiting, retry backoff and circuit breaking for calls to external APIs
+"""
+
+import time
+import random
+import asyncio
+from typing import Optional
+from loguru import logger
+
+from app.core.exceptions import CircuitOpenError
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled at `rate` tokens per second, holding at most `capacity`
+
+    Waiters are served in arrival order: the lock is held while sleeping for
+    the next token, so a burst of callers is spread out evenly.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available and take them"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Fails fast once a dependency has failed `failure_threshold` times in a row
+
+    While open, check() raises CircuitOpenError without calling the
+    dependency. After `reset_seconds` the breaker lets a single trial call
+    through (half-open) and keeps rejecting the others until it finishes; a
+    success closes it again and a failure re-opens it. A trial that never
+    reports back (e.g. cancelled) is replaced after another `reset_seconds`.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None  # Trial call in flight while half-open
+
+    @property
+    def state(self) -> str:
+        """closed, open or half_open"""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def check(self):
+        """Raise CircuitOpenError if calls are currently rejected"""
+        state = self.state
+        if state == "open":
+            retry_in = self.reset_seconds - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"{self.name} unavailable after repeated failures, retry in {retry_in:.0f}s")
+
+        if state == "half_open":
+            now = time.monotonic()
+            if self.probe_started_at is not None and now - self.probe_started_at < self.reset_seconds:
+                raise CircuitOpenError(f"{self.name} unavailable, waiting for a trial call to finish")
+            # This caller is the trial call
+            self.probe_started_at = now
+
+    def record_success(self):
+        """Close the breaker after a successful call"""
+        if self.opened_at is not None:
+            logger.info(f"{self.name} circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self):
+        """Count a failed call, opening the breaker at the threshold"""
+        self.failures += 1
+        self.probe_started_at = None
+        if self.state == "half_open" or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            logger.warning(f"{self.name} circuit opened after {self.failures} consecutive failures")
+
+    def release(self):
+        """End a call that says nothing about the dependency's health, freeing the trial slot"""
+        self.probe_started_at = None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for a zero-based retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
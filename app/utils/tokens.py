@@ -0,0 +1,17 @@
+"""
+Token estimation shared by chunking and prompt budgeting
+"""
+
+# Subword tokenizers average about four characters per token on English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a piece of text
+
+    Uses the larger of one token per CHARS_PER_TOKEN characters and one token
+    per whitespace-separated word, which tracks subword tokenizers closely on
+    prose and stays cheap enough to run on every sentence during chunking.
+    """
+    return max(len(text.split()), (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
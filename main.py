@@ -3,9 +3,13 @@ LLM Document Processing System - Main Application Entry Point
 """
 
 import os
+import time
+import asyncio
+import httpx
 import uvicorn
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
@@ -14,6 +18,11 @@ from loguru import logger
 from app.api.routes import router as api_router
 from app.core.config import settings
 from app.core.exceptions import setup_exception_handlers
+from app.services.document_processor import DocumentProcessor
+from app.services.query_processor import QueryProcessor
+from app.services.llm_service import LLMService
+from app.services.chunk_enrichment import ChunkEnrichmentService
+from app.services.text_cache import ExtractedTextCache
 
 # Use ChromaDB vector store for Cloud Run deployment (more reliable)
 from app.services.vector_store_chroma import ChromaVectorStoreService as VectorStoreService
@@ -25,15 +34,24 @@ load_dotenv()
 from app.utils.logging_config import setup_logging
 setup_logging()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan manager"""
-    # Startup
-    logger.info("Starting LLM Document Processing System...")
+async def warm_up(app: FastAPI):
+    """
+    Build the model-backed services after the server has started listening
+    
+    Importing the Gemini SDK, chromadb and torch, probing the embedding API and
+    loading the local model take seconds; doing it here rather than in the
+    lifespan lets the port open immediately. Constructors that import heavy
+    modules or read from disk run in threads so /health stays responsive.
+    Requests that need these services wait for this task (see app.api.dependencies).
+    """
+    started = time.perf_counter()
+    
+    app.state.llm_service = await asyncio.to_thread(LLMService)
+    app.state.query_processor = QueryProcessor(llm_service=app.state.llm_service)
     
     # Initialize vector store with error handling
     try:
-        vector_store = VectorStoreService()
+        vector_store = await asyncio.to_thread(VectorStoreService)
         await vector_store.initialize()
         app.state.vector_store = vector_store
         logger.info("Vector store initialized successfully")
@@ -42,17 +60,72 @@ async def lifespan(app: FastAPI):
         # Continue without vector store for basic functionality
         app.state.vector_store = None
     
-    logger.info("System initialized successfully")
+    # Background chunk enrichment (disabled with CHUNK_ENRICHERS="")
+    if app.state.vector_store is not None:
+        app.state.enrichment_service = ChunkEnrichmentService(app.state.vector_store)
+        app.state.enrichment_service.start()
+    
+    app.state.document_processor = DocumentProcessor(
+        vector_store=app.state.vector_store,
+        http_client=app.state.http_client,
+        enrichment_service=app.state.enrichment_service,
+        text_cache=app.state.text_cache
+    )
+    
+    logger.info(f"System warmed up in {time.perf_counter() - started:.1f}s")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan manager"""
+    # Startup
+    logger.info("Starting LLM Document Processing System...")
+    
+    # Application-scoped services, shared by every request
+    app.state.http_client = httpx.AsyncClient(
+        timeout=30.0,
+        limits=httpx.Limits(
+            max_connections=settings.MAX_CONCURRENT_DOWNLOADS * 4,
+            max_keepalive_connections=settings.MAX_CONCURRENT_DOWNLOADS
+        )
+    )
+    app.state.vector_store = None
+    app.state.enrichment_service = None
+    
+    # Extracted text for URL documents, revalidated on each request (disabled with TEXT_CACHE_MAX_MB=0)
+    app.state.text_cache = None
+    if settings.TEXT_CACHE_MAX_MB > 0:
+        app.state.text_cache = ExtractedTextCache(settings.TEXT_CACHE_PATH, settings.TEXT_CACHE_MAX_MB * 1024 * 1024)
+    
+    # Models and indexes load in the background; /ready reports when they are done
+    app.state.warmup_task = asyncio.create_task(warm_up(app))
+    
+    logger.info("System started, warming up in the background")
     
     yield
     
     # Shutdown
     logger.info("Shutting down system...")
+    if not app.state.warmup_task.done():
+        app.state.warmup_task.cancel()
+    try:
+        await app.state.warmup_task
+    except BaseException as e:
+        logger.warning(f"Warm-up did not complete: {e!r}")
+    
+    if getattr(app.state, 'enrichment_service', None):
+        await app.state.enrichment_service.close()
+    
     if hasattr(app.state, 'vector_store') and app.state.vector_store:
         try:
             await app.state.vector_store.close()
         except Exception as e:
             logger.error(f"Error during shutdown: {e}")
+    
+    if hasattr(app.state, 'http_client'):
+        await app.state.http_client.aclose()
+    
+    if hasattr(app.state, 'document_processor'):
+        app.state.document_processor.close()
 
 # Create FastAPI application
 app = FastAPI(
@@ -80,6 +153,23 @@ app.include_router(
     prefix="/hackrx"
 )
 
+# Probes are registered before the static mount, which matches every other path
+@app.get("/health")
+async def health_check():
+    """Liveness check; answers as soon as the server is listening"""
+    return {"status": "healthy", "version": "1.0.0"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check; 503 until the background warm-up has finished"""
+    warmup = getattr(app.state, "warmup_task", None)
+    if warmup is None or not warmup.done():
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    if warmup.cancelled() or warmup.exception() is not None:
+        error = "cancelled" if warmup.cancelled() else str(warmup.exception())
+        return JSONResponse(status_code=503, content={"status": "failed", "error": error})
+    return {"status": "ready", "vector_store": app.state.vector_store is not None}
+
 # Mount static files for the frontend
 app.mount("/", StaticFiles(directory="frontend/dist", html=True), name="static")
 
@@ -88,11 +178,6 @@ async def root():
     """Root endpoint for platform health checks"""
     return {"message": "LLM Document Processing System", "status": "running"}
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "version": "1.0.0"}
-
 if __name__ == "__main__":
     # Get port from environment (works with Render, Railway, Heroku, etc.)
     port = int(os.environ.get("PORT", settings.API_PORT))
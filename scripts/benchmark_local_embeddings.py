@@ -0,0 +1,89 @@
+"""
+Compare the fp32 and int8 local embedding backends on throughput and agreement
+
+Usage:
+    python scripts/benchmark_local_embeddings.py [--texts FILE] [--threads N] [--max-seq-length N]
+
+FILE holds one text per line (e.g. exported chunks); without it a synthetic
+policy-style corpus is used. Reports texts/second for each backend, the
+cosine similarity between fp32 and int8 vectors of the same text, and how
+often both backends return the same top-5 neighbours for sample queries.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.embedding_service import LOCAL_EMBEDDING_MODEL_NAME  # noqa: E402
+from app.services.local_embeddings import load_local_model  # noqa: E402
+
+
+def synthetic_texts(count: int):
+    """Policy-like sentences of varying length"""
+    clauses = [
+        "The insured shall notify the company within thirty days of any claim.",
+        "Pre-existing conditions are covered after a waiting period of 36 months.",
+        "Room rent is limited to one percent of the sum insured per day.",
+        "Cataract surgery is payable up to the limit specified in the schedule.",
+        "The grace period for premium payment is fifteen days for monthly mode.",
+        "Organ donor expenses are covered when the recipient is the insured person.",
+    ]
+    return [" ".join(clauses[(i + j) % len(clauses)] for j in range(1 + i % 8)) for i in range(count)]
+
+
+def encode(model, texts, batch_size):
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return vectors, time.perf_counter() - start
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=Path, help="File with one text per line")
+    parser.add_argument("--count", type=int, default=1000, help="Synthetic texts to generate")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--max-seq-length", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    if args.texts:
+        texts = [line.strip() for line in args.texts.read_text(encoding="utf-8").splitlines() if line.strip()]
+    else:
+        texts = synthetic_texts(args.count)
+
+    results = {}
+    for backend in ("fp32", "int8"):
+        model = load_local_model(
+            LOCAL_EMBEDDING_MODEL_NAME,
+            backend=backend,
+            threads=args.threads,
+            max_seq_length=args.max_seq_length
+        )
+        encode(model, texts[:args.batch_size], args.batch_size)  # Warm up
+        vectors, elapsed = encode(model, texts, args.batch_size)
+        results[backend] = normalize(vectors)
+        print(f"{backend}: {len(texts) / elapsed:8.1f} texts/s ({elapsed:.2f}s for {len(texts)} texts)")
+
+    fp32, int8 = results["fp32"], results["int8"]
+    cosine = np.sum(fp32 * int8, axis=1)
+    print(f"cosine(fp32, int8): mean {cosine.mean():.4f}, min {cosine.min():.4f}, p1 {np.percentile(cosine, 1):.4f}")
+
+    # Retrieval agreement: top-5 neighbours of a sample of texts used as queries
+    queries = np.arange(0, len(texts), max(1, len(texts) // 100))
+    k = min(5, len(texts))
+    top_fp32 = np.argsort(-(fp32[queries] @ fp32.T), axis=1)[:, :k]
+    top_int8 = np.argsort(-(int8[queries] @ int8.T), axis=1)[:, :k]
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(top_fp32, top_int8)])
+    print(f"top-{k} neighbour overlap: {overlap:.1%} over {len(queries)} queries")
+
+
+if __name__ == "__main__":
+    main()
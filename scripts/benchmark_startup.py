@@ -0,0 +1,114 @@
+"""
+Measure cold-start time: importing the application, and serving /health and /ready
+
+Usage:
+    python scripts/benchmark_startup.py [--runs N] [--serve] [--port PORT] [--timeout SECONDS]
+
+Each run uses a fresh interpreter, as a new container would. Reports the time
+to import main.py and which heavy dependencies that import pulled in. With
+--serve it also starts uvicorn and reports the time until /health first
+answers (the port is open) and until /ready returns 200 (models and indexes
+are warmed up).
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that should stay out of the import path and load during warm-up
+HEAVY_MODULES = [
+    "chromadb", "faiss", "fitz", "pdfplumber", "docx", "textstat",
+    "sentence_transformers", "torch", "google.generativeai",
+]
+
+IMPORT_PROBE = f"""
+import sys, time, json
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import():
+    """Import main in a fresh interpreter, returning (seconds, heavy modules loaded)"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["seconds"], result["loaded"]
+
+
+def wait_for(url: str, deadline: float, status: int = 200):
+    """Poll url until it returns status, returning the time it did or None at the deadline"""
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == status:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def measure_serve(port: int, timeout: float):
+    """Start uvicorn, returning (seconds to /health, seconds to /ready or None)"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = started + timeout
+        healthy = wait_for(f"http://127.0.0.1:{port}/health", deadline)
+        if healthy is None:
+            return None, None
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", deadline)
+        return healthy - started, (ready - started) if ready else None
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def summarize(label: str, samples):
+    samples = [sample for sample in samples if sample is not None]
+    if not samples:
+        print(f"{label}: no successful runs")
+        return
+    print(f"{label}: median {statistics.median(samples):.2f}s, min {min(samples):.2f}s, max {max(samples):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--serve", action="store_true", help="Also time /health and /ready under uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Give up on a server run after this long")
+    args = parser.parse_args()
+
+    import_times = []
+    for _ in range(args.runs):
+        seconds, loaded = measure_import()
+        import_times.append(seconds)
+    summarize("import main", import_times)
+    print(f"heavy modules loaded by import: {', '.join(loaded) or 'none'}")
+
+    if args.serve:
+        health_times, ready_times = [], []
+        for _ in range(args.runs):
+            healthy, ready = measure_serve(args.port, args.timeout)
+            health_times.append(healthy)
+            ready_times.append(ready)
+        summarize("first /health", health_times)
+        summarize("first ready /ready", ready_times)
+
+
+if __name__ == "__main__":
+    main()